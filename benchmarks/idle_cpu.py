@@ -0,0 +1,107 @@
+"""
+Cpu usage of the gui process while views receive data and after the data stopped.
+
+Feeds N matplotlib views through their draw rings (as the executor would) for a few seconds, then stops writing.
+With dirty-flag rendering the idle phase should be close to 0%.
+
+    python benchmarks/idle_cpu.py [--views 8] [--seconds 5] [--rate 30]
+"""
+import os
+import time
+import threading as th
+
+import click
+import numpy as np
+
+from livenodes.viewer import View_MPL
+from livenodes.components.port import Port, Ports_collection
+
+
+class Port_Any(Port):
+    example_values = [np.zeros((1, 2))]
+    label = 'Data'
+
+    @staticmethod
+    def check_value(value):
+        return True, None
+
+
+class Ports_data(Ports_collection):
+    data: Port_Any = Port_Any('Data')
+
+
+class Ports_none(Ports_collection):
+    pass
+
+
+class Bench_Plot(View_MPL):
+    ports_in = Ports_data()
+    ports_out = Ports_none()
+
+    def _init_draw(self, figure):
+        ax = figure.add_subplot(111)
+        ax.set_ylim(-1, 1)
+        lines = ax.plot(np.zeros((100, 4)))
+
+        def update(data):
+            for i, l in enumerate(lines):
+                l.set_ydata(data[:, i])
+            return lines
+        return update
+
+
+def _write(rings, rate, stop):
+    i = 0
+    while not stop.is_set():
+        for ring in rings:
+            ring.write(data=np.sin(np.linspace(0, 6, 100)[:, None] + i / 10) * np.ones((1, 4)))
+        i += 1
+        time.sleep(1 / rate)
+
+
+def _measure(app, seconds):
+    cpu, wall = time.process_time(), time.time()
+    while time.time() - wall < seconds:
+        app.processEvents()
+        time.sleep(0.001)
+    return 100 * (time.process_time() - cpu) / (time.time() - wall)
+
+
+@click.command()
+@click.option('--views', default=8, help='Number of matplotlib views')
+@click.option('--seconds', default=5.0, help='Duration of each phase')
+@click.option('--rate', default=30, help='Frames per second written into each view')
+def main(views, seconds, rate):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from qtpy import QtWidgets
+    app = QtWidgets.QApplication([])
+
+    from ln_studio.components.views.matplotlib import MPL_View
+    from ln_studio.utils.shm_ring import attach_ring_buffer
+
+    nodes = [Bench_Plot(name=f'Plot {i}') for i in range(views)]
+    rings = [attach_ring_buffer(n) for n in nodes]
+    widgets = [MPL_View(n) for n in nodes]
+
+    stop = th.Event()
+    writer = th.Thread(target=_write, args=(rings, rate, stop), daemon=True)
+    writer.start()
+    active = _measure(app, seconds)
+    stop.set()
+    writer.join()
+    # let the views pick up the last frames
+    _measure(app, 0.5)
+    idle = _measure(app, seconds)
+
+    print(f'{views} views, {rate} fps each')
+    print(f'receiving data: {active:6.1f}% cpu')
+    print(f'idle:           {idle:6.1f}% cpu')
+
+    for w in widgets:
+        w.stop()
+    for r in rings:
+        r.close()
+
+
+if __name__ == '__main__':
+    main()
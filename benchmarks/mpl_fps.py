@@ -0,0 +1,50 @@
+"""
+Achievable frames per second of a matplotlib line plot view, full redraw vs blitting.
+
+Every frame writes new data into the view's draw ring and renders it, as fast as possible.
+
+    python benchmarks/mpl_fps.py [--frames 300]
+"""
+import os
+import time
+
+import click
+import numpy as np
+
+from idle_cpu import Bench_Plot
+
+
+def _fps(app, view, ring, frames):
+    t = time.perf_counter()
+    for i in range(frames):
+        ring.write(data=np.sin(np.linspace(0, 6, 100)[:, None] + i / 10) * np.ones((1, 4)))
+        view.draw_update()
+        app.processEvents()
+    return frames / (time.perf_counter() - t)
+
+
+@click.command()
+@click.option('--frames', default=300, help='Frames rendered per mode')
+def main(frames):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from qtpy import QtWidgets
+    app = QtWidgets.QApplication([])
+
+    from ln_studio.components.views.matplotlib import MPL_View
+    from ln_studio.utils.shm_ring import attach_ring_buffer
+
+    for blit in [False, True]:
+        node = Bench_Plot(name=f'Plot blit={blit}')
+        ring = attach_ring_buffer(node)
+        view = MPL_View(node, blit=blit)
+        # only measure the draw path, not the scheduler
+        view.render_task.pause()
+        view.resize(600, 400)
+        _fps(app, view, ring, 10)
+        print(f'blit={blit!s:<5}: {_fps(app, view, ring, frames):7.1f} fps')
+        view.stop()
+        ring.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Frames per second of the native time series view: appends the samples of one frame and repaints, as fast as possible.
+
+    python benchmarks/timeseries_fps.py [--channels 32] [--rate 2000] [--window 10] [--frames 300]
+"""
+import os
+import time
+
+import click
+import numpy as np
+
+from ln_studio.viewer import View_Timeseries
+from idle_cpu import Ports_data, Ports_none
+
+
+class Bench_Timeseries(View_Timeseries):
+    ports_in = Ports_data()
+    ports_out = Ports_none()
+
+
+@click.command()
+@click.option('--channels', default=32)
+@click.option('--rate', default=2000, help='Samples per second and channel')
+@click.option('--window', default=10.0, help='Seconds of history shown')
+@click.option('--frames', default=300)
+def main(channels, rate, window, frames):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from qtpy import QtWidgets
+    app = QtWidgets.QApplication([])
+
+    from ln_studio.components.views.timeseries import Timeseries_View
+
+    node = Bench_Timeseries(name='Timeseries')
+    node.plot_window, node.plot_sample_rate = window, rate
+    view = Timeseries_View(node)
+    view.render_task.pause()
+    view.resize(1600, 900)
+    view.show()
+
+    # fill the history, decimation works on the full window from here on
+    view.append(np.random.randn(int(window * rate), channels))
+    per_frame = rate // 60
+    t = time.perf_counter()
+    for i in range(frames):
+        view.append(np.random.randn(per_frame, channels))
+        view.repaint()
+        app.processEvents()
+    fps = frames / (time.perf_counter() - t)
+    print(f'{channels} channels x {window}s at {rate} Hz, {view.width()}x{view.height()} px: {fps:.1f} fps')
+    view.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,6 @@ from functools import partial
 import json
 import os
 import inspect
-import yaml
 
 from qtpy.QtWidgets import QHBoxLayout, QWidget
 from qtpy.QtCore import Signal
@@ -16,6 +15,7 @@ from ln_studio.qtpynodeeditor import FlowScene, FlowView, DataModelRegistry, Nod
 from ln_studio.qtpynodeeditor.node_graphics_object import NodeGraphicsObject
 from ln_studio.qtpynodeeditor.exceptions import ConnectionDataTypeFailure, MultipleInputConnectionError
 
+from ln_studio.utils import pipeline_cache
 from .edit_node import CreateNodeDialog
 
 import logging
@@ -27,6 +27,9 @@ class CustomNodeDataModel(NodeDataModel, verify=False):
         super().__init__(style, parent)
         self.association_to_node = None
         self.flow_scene = None
+        # set by Node_Heatmap while a pipeline is debugged
+        self.runtime_painter = None
+        self.runtime_stats = None
 
         # self._info = QLabel("Info")
 
@@ -36,6 +39,9 @@ class CustomNodeDataModel(NodeDataModel, verify=False):
     def set_flow_scene(self, flow_scene):
         self.flow_scene = flow_scene
 
+    def painter_delegate(self):
+        return self.runtime_painter
+
 
     def __getstate__(self) -> dict:
         res = super().__getstate__()
@@ -324,12 +330,10 @@ class QT_Graph_edit(QWidget):
 
     @staticmethod
     def _load_compact_yml(path):
-        if os.stat(path).st_size == 0:
+        yaml_dict = pipeline_cache.load_compact_yml(path)
+        if yaml_dict is None:
             # the pipeline was just created and no nodes were added yet
             return None
-         
-        with open(path, 'r') as f:
-            yaml_dict = yaml.load(f, Loader=yaml.Loader)
         
         dct = {}
         for node_str, cfg in yaml_dict['Nodes'].items():
@@ -412,7 +416,7 @@ class QT_Graph_edit(QWidget):
 
     def _load_pipeline_resolve_macro(self, pipeline_path, layout_nodes):
         ### Add nodes
-        pipeline = Node.load(pipeline_path)
+        pipeline = pipeline_cache.load_pipeline(pipeline_path)
         if hasattr(pipeline, 'get_non_macro_node'):
             pipeline = pipeline.get_non_macro_node()
 
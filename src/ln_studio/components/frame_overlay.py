@@ -0,0 +1,39 @@
+from qtpy import QtCore
+from qtpy.QtWidgets import QLabel
+
+from .render_scheduler import get_render_scheduler
+
+
+class Frame_Stats_Overlay(QLabel):
+    """
+    Small label on top of a view showing the frame stats of its render task (fps, draw time percentiles, skipped frames).
+    Hidden by default, while hidden the scheduler does not update it.
+    """
+
+    def __init__(self, view, interval=500):
+        super().__init__(parent=view)
+        self.view = view
+        self.setStyleSheet("QLabel { background-color: rgba(0, 0, 0, 160); color: white; padding: 2px 4px; }")
+        self.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents)
+        self.hide()
+        self.overlay_task = get_render_scheduler().register(self, self.update_text, interval)
+
+    def update_text(self):
+        task = self.view.render_task
+        if task is None:
+            return
+        stats = task.stats
+        draw = stats.draw
+        self.setText(f"{stats.fps():.1f} fps\n"
+                     f"draw p50 {draw.percentile(50) * 1000:.2f}ms / p99 {draw.percentile(99) * 1000:.2f}ms\n"
+                     f"skipped {stats.skipped}")
+        self.adjustSize()
+        self.raise_()
+
+    def set_shown(self, shown):
+        self.setVisible(shown)
+        if shown:
+            self.update_text()
+
+    def stop(self):
+        self.overlay_task.remove()
@@ -0,0 +1,82 @@
+import os
+import logging
+from collections import deque
+
+from qtpy import QtGui
+from qtpy.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QComboBox, QLineEdit
+
+# lines kept per log view, older lines are dropped (from the widget and the filter history)
+LOG_MAX_LINES = int(os.getenv('LNS_LOG_MAX_LINES', 5000))
+
+LEVELS = [('Debug', logging.DEBUG), ('Info', logging.INFO), ('Warning', logging.WARNING), ('Error', logging.ERROR)]
+
+
+class Log_View(QWidget):
+    """
+    Append-only log panel with level and substring filter.
+
+    append() only queues lines, flush() (once per frame) adds all queued lines that pass the filter in a single edit.
+    The text widget keeps at most LOG_MAX_LINES blocks, so appending stays cheap no matter how long the pipeline runs.
+    """
+
+    def __init__(self, max_lines=LOG_MAX_LINES, parent=None):
+        super().__init__(parent=parent)
+
+        self.lines = deque(maxlen=max_lines)
+        self.pending = deque(maxlen=max_lines)
+
+        self.level = QComboBox()
+        for name, level in LEVELS:
+            self.level.addItem(name, level)
+        self.level.setCurrentIndex(0)
+        self.level.currentIndexChanged.connect(self.refilter)
+
+        self.filter = QLineEdit()
+        self.filter.setPlaceholderText('Filter')
+        self.filter.setClearButtonEnabled(True)
+        self.filter.textChanged.connect(self.refilter)
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setMaximumBlockCount(max_lines)
+        self.text.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.text.setUndoRedoEnabled(False)
+
+        controls = QHBoxLayout()
+        controls.addWidget(self.level)
+        controls.addWidget(self.filter)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(controls)
+        layout.addWidget(self.text)
+
+    def append(self, text, level=logging.INFO):
+        self.pending.append((level, text))
+
+    def _passes(self, level, text):
+        return level >= self.level.currentData() and self.filter.text().lower() in text.lower()
+
+    @staticmethod
+    def _format(level, text):
+        return f'{logging.getLevelName(level)[0]} {text}'
+
+    def flush(self):
+        if len(self.pending) == 0:
+            return
+        lines = list(self.pending)
+        self.pending.clear()
+        self.lines.extend(lines)
+        shown = [self._format(level, text) for level, text in lines if self._passes(level, text)]
+        if len(shown) == 0:
+            return
+
+        # only follow the log if the user did not scroll up
+        bar = self.text.verticalScrollBar()
+        at_bottom = bar.value() >= bar.maximum() - 2
+        self.text.appendPlainText('\n'.join(shown))
+        if at_bottom:
+            bar.setValue(bar.maximum())
+
+    def refilter(self, *args):
+        self.text.setPlainText('\n'.join(self._format(level, text) for level, text in self.lines if self._passes(level, text)))
+        self.text.moveCursor(QtGui.QTextCursor.End)
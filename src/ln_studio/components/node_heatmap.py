@@ -0,0 +1,176 @@
+import numpy as np
+
+from qtpy import QtCore, QtGui
+
+from livenodes import Connection
+
+from ln_studio.qtpynodeeditor.node_painter import NodePainterDelegate
+from ln_studio.utils.node_stats import node_rates
+from ln_studio.utils.connection_stats import connection_rates
+from .render_scheduler import get_render_scheduler
+
+# below this share of a core a node is never drawn hot, so that an idle pipeline does not light up its busiest node
+MIN_HOT_LOAD = 0.1
+# items waiting in a node's inputs from which its backlog is highlighted
+BACKLOG_WARN = 10
+
+
+def heat_color(heat, alpha=255):
+    # green (idle) over yellow to red (busiest node)
+    color = QtGui.QColor.fromHsvF((1 - min(max(heat, 0), 1)) / 3, 0.85, 0.95)
+    color.setAlpha(alpha)
+    return color
+
+
+def _format_duration(seconds):
+    if seconds >= 1:
+        return f'{seconds:.2f}s'
+    if seconds >= 1e-3:
+        return f'{seconds * 1e3:.1f}ms'
+    return f'{seconds * 1e6:.0f}µs'
+
+
+def _format_bytes(n):
+    for unit in ['B', 'kB', 'MB']:
+        if n < 1000:
+            return f'{n:.0f}{unit}'
+        n /= 1000
+    return f'{n:.1f}GB'
+
+
+class Heat_Painter_Delegate(NodePainterDelegate):
+    """
+    Draws the runtime stats of a node model (model.runtime_stats, set by Node_Heatmap): a tint and border in the heat colour and a badge line below the node.
+    """
+
+    def paint(self, painter, geom, model):
+        stats = getattr(model, 'runtime_stats', None)
+        if stats is None:
+            return
+        rate, per_call, heat, backlog = stats
+
+        painter.save()
+        rect = QtCore.QRectF(0, 0, geom.width, geom.height)
+        painter.setPen(QtGui.QPen(heat_color(heat), 3))
+        painter.setBrush(heat_color(heat, alpha=50))
+        painter.drawRoundedRect(rect, 3, 3)
+
+        text = f'{rate:.0f}/s  {_format_duration(per_call)}'
+        if backlog != 0:
+            text += f'  q {backlog:.0f}' if backlog > 0 else '  q ?'
+        font = painter.font()
+        font.setPointSizeF(font.pointSizeF() * 0.85)
+        painter.setFont(font)
+        metrics = QtGui.QFontMetrics(font)
+        # centred below the node and kept within the graphics object's bounding rect (room for one line), anything outside
+        # would be clipped and leave trails on repaint. Narrow nodes elide the text.
+        bounds = geom.bounding_rect
+        width = min(max(geom.width, metrics.horizontalAdvance(text) + 8), bounds.width())
+        top = geom.height + 8
+        badge = QtCore.QRectF((geom.width - width) / 2, top, width, min(metrics.height() + 2, bounds.bottom() - top))
+        text = metrics.elidedText(text, QtCore.Qt.ElideRight, int(width) - 8)
+        painter.setPen(QtCore.Qt.NoPen)
+        painter.setBrush(QtGui.QColor(0, 0, 0, 170))
+        painter.drawRoundedRect(badge, 3, 3)
+        painter.setPen(heat_color(1) if backlog >= BACKLOG_WARN else QtGui.QColor('white'))
+        painter.drawText(badge, QtCore.Qt.AlignCenter, text)
+        painter.restore()
+
+
+def connection_key(connection):
+    """
+    Key of a qtpynodeeditor connection in a Connection_Stats_Table, None if its nodes are not associated with livenodes nodes.
+    """
+    in_port, out_port = connection.ports
+    model = in_port.model
+    emit_node, recv_node, emit_label, recv_label = model._get_port_infos(connection)
+    if emit_node is None or recv_node is None:
+        return None
+    return Connection(emit_node, recv_node, emit_node.get_port_out_by_label(emit_label), recv_node.get_port_in_by_label(recv_label)).serialize_compact()
+
+
+class Node_Heatmap():
+    """
+    Colours the nodes of a QT_Graph_edit by their load: samples a Node_Stats_Table every `interval` ms and updates the models' runtime stats.
+    If a Connection_Stats_Table is given, the connections are annotated with their traffic as well.
+
+    Heat is the node's share of wall time spent in process relative to the busiest node, so the bottleneck is always the red one.
+    Connections are drawn thicker and hotter the more bytes they carry relative to the busiest connection.
+    """
+
+    def __init__(self, graph_edit, node_stats, connection_stats=None, interval=250):
+        self.graph_edit = graph_edit
+        self.node_stats = node_stats
+        self.connection_stats = connection_stats
+        self.delegate = Heat_Painter_Delegate()
+        self.previous = None
+        self.previous_connections = None
+
+        self.models = {}
+        for node in graph_edit.scene.nodes.values():
+            pl_node = node.model.association_to_node
+            if pl_node is not None and str(pl_node) in node_stats.index:
+                node.model.runtime_painter = self.delegate
+                self.models[str(pl_node)] = node
+
+        self.connections = {}
+        if connection_stats is not None:
+            for connection in graph_edit.scene.connections:
+                key = connection_key(connection)
+                if key in connection_stats.index:
+                    self.connections[key] = connection
+
+        self.render_task = get_render_scheduler().register(graph_edit, self.update, interval)
+
+    def update(self):
+        if self.node_stats.table is None:
+            return
+        current = self.node_stats.sample()
+        if self.previous is None:
+            self.previous = current
+            return
+        rate, per_call, load, backlog = node_rates(self.previous, current)
+        self.previous = current
+
+        hottest = max(np.max(load, initial=0), MIN_HOT_LOAD)
+        for name, node in self.models.items():
+            i = self.node_stats.index[name]
+            node.model.runtime_stats = (rate[i], per_call[i], load[i] / hottest, backlog[i])
+            node.graphics_object.update()
+
+        if len(self.connections) > 0 and self.connection_stats.table is not None:
+            self.update_connections()
+
+    def update_connections(self):
+        current = self.connection_stats.sample()
+        if self.previous_connections is None:
+            self.previous_connections = current
+            return
+        msgs, data_rate, latency = connection_rates(self.previous_connections, current)
+        self.previous_connections = current
+
+        hottest = max(np.max(data_rate, initial=0), 1)
+        for key, connection in self.connections.items():
+            i = self.connection_stats.index[key]
+            load = data_rate[i] / hottest
+            label = f'{msgs[i]:.0f}/s  {_format_bytes(data_rate[i])}/s'
+            if not np.isnan(latency[i]):
+                label += f'  {_format_duration(latency[i])}'
+            self._set_connection_stats(connection, (label, heat_color(load, alpha=200), 1.5 + 4.5 * load))
+
+    @staticmethod
+    def _set_connection_stats(connection, stats):
+        graphics = connection.graphics_object
+        if (connection.runtime_stats is None) != (stats is None):
+            # the label changes the bounding rect
+            graphics.set_geometry_changed()
+        connection.runtime_stats = stats
+        graphics.update()
+
+    def stop(self):
+        self.render_task.remove()
+        for node in self.models.values():
+            node.model.runtime_stats = None
+            node.graphics_object.update()
+        for connection in self.connections.values():
+            self._set_connection_stats(connection, None)
@@ -1,34 +1,46 @@
 # import json
-import yaml
+import os
 import numpy as np
-import multiprocessing as mp
+from collections import deque
 from livenodes import viewer
 
 from qtpy import QtCore
+from qtpy.QtCore import Signal
 from qtpy.QtWidgets import QWidget
-from qtpy.QtCore import QTimer
 
 from qtpy.QtWidgets import QSplitter, QVBoxLayout, QWidget, QHBoxLayout, QLabel
 
-from .scroll_label import ScrollLabel
+from .log_view import Log_View
+from .state_inspector import State_Inspector
 from .views.pyqt import QT_View
+from .views.timeseries import Timeseries_View
 from .utils import is_installed
+from ln_studio.utils.report_channel import Report_Writer
+from ln_studio.viewer import View_Timeseries
+from .render_scheduler import get_render_scheduler
 
 import logging
 logger = logging.getLogger('LN-Studio')
 
+# seconds a built debug view may stay hidden before it is torn down again, 0 keeps it until the page closes
+DEBUG_VIEW_TEARDOWN_S = float(os.getenv('LNS_DEBUG_VIEW_TEARDOWN_S', 0))
+
 # TODO: make each subplot their own animation and use user customizable panels
 # TODO: allow nodes to use qt directly -> also consider how to make this understandable to user (ie some nodes will not run everywhere then)
 
 def node_view_mapper(parent, node):
     if isinstance(node, viewer.View_MPL):
         if is_installed('matplotlib'):
-            from .views.matplotlib import MPL_View
+            from .views.matplotlib import MPL_View, MPL_Thread_View, RENDER_THREAD
+            if getattr(node, 'render_thread', RENDER_THREAD):
+                return MPL_Thread_View(node)
             return MPL_View(node)
         else:
             raise ValueError('Matplotlib not installed, cannot load MPL_View')
     elif isinstance(node, viewer.View_QT):
         return QT_View(node, parent=parent)
+    elif isinstance(node, View_Timeseries):
+        return Timeseries_View(node, parent=parent)
     else:
         raise ValueError(f'Unkown Node type {str(node)}')
 
@@ -40,23 +52,104 @@ class Debug_Metrics(QWidget):
         if view is not None:
             self.fps = QLabel('FPS: xxx')
             layout_metrics.addWidget(self.fps)
+        self.render_label = None
+        if hasattr(view, 'render_stats'):
+            # views rendering off the gui thread
+            self.render_label = QLabel('')
+            layout_metrics.addWidget(self.render_label)
         self.latency = QLabel('')
         layout_metrics.addWidget(self.latency)
 
+class Lazy_Debug_View(QWidget):
+    """
+    Placeholder in a node's dock, the node's Debug_View (and its view) is only built the first time the dock is shown.
+
+    With a teardown delay the Debug_View is stopped and dropped once it was hidden for that long, the placeholder takes its place
+    until the dock is shown again. The reporter lives here, so that the executor can be handed it before any view exists.
+    """
+    built = Signal(object)
+    torn_down = Signal(object)
+
+    def __init__(self, node, report_channel, make_view=None, teardown_after=DEBUG_VIEW_TEARDOWN_S, parent=None):
+        super().__init__(parent=parent)
+
+        self.node = node
+        self.report_channel = report_channel
+        self.make_view = make_view
+        self.widget = None
+        self.stopped = False
+
+        # handed to the executor, writes the node's reports into its slot of the report channel
+        self.reporter = Report_Writer(report_channel, str(node))
+
+        self.placeholder = QLabel('Loading…')
+        self.placeholder.setAlignment(QtCore.Qt.AlignCenter)
+        self.l = QVBoxLayout(self)
+        self.l.setContentsMargins(0, 0, 0, 0)
+        self.l.addWidget(self.placeholder)
+
+        self.teardown_timer = QtCore.QTimer(self)
+        self.teardown_timer.setSingleShot(True)
+        self.teardown_timer.setInterval(int(teardown_after * 1000))
+        self.teardown_timer.timeout.connect(self.teardown)
+        self.teardown_after = teardown_after
+
+    @property
+    def view(self):
+        return None if self.widget is None else self.widget.view
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.teardown_timer.stop()
+        if self.widget is None and not self.stopped:
+            self.build()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        if self.widget is not None and self.teardown_after > 0:
+            self.teardown_timer.start()
+
+    def build(self):
+        logger.info(f'Building debug view of {self.node}')
+        view = self.make_view() if self.make_view is not None else None
+        self.widget = Debug_View(self.node, self.report_channel, view=view, parent=self)
+        self.placeholder.hide()
+        self.l.addWidget(self.widget)
+        self.built.emit(self.widget)
+
+    def teardown(self):
+        if self.widget is None:
+            return
+        logger.info(f'Tearing down debug view of {self.node}, hidden for {self.teardown_after:.0f}s')
+        widget, self.widget = self.widget, None
+        self.torn_down.emit(widget)
+        widget.stop()
+        # no one is looking, the executor can stop serializing the node's reports
+        widget.set_reporting(False)
+        self.l.removeWidget(widget)
+        widget.deleteLater()
+        self.placeholder.show()
+
+    def stop(self):
+        self.stopped = True
+        self.teardown_timer.stop()
+        if self.widget is not None:
+            self.widget.stop()
+
+
 class Debug_View(QWidget):
-    def __init__(self, node, view=None, parent=None):
+    def __init__(self, node, report_channel, view=None, parent=None):
         super().__init__(parent=parent)
 
         self.view = view 
         self.node = node
+        self.report_channel = report_channel
 
         self.metrics = Debug_Metrics(view)
 
-        self.log = ScrollLabel(keep_bottom=True)
-        self.log_list = ['--- Log --------–-------']
-        self.log.setText('\n'.join(self.log_list))
+        self.log = Log_View()
 
-        self.state = ScrollLabel()
+        self.state = State_Inspector()
 
         self.layout = QSplitter(QtCore.Qt.Vertical)
         i = 0
@@ -74,26 +167,50 @@ class Debug_View(QWidget):
         l = QHBoxLayout(self)
         l.addWidget(self.layout)
 
-        self.val_queue = mp.Queue()
-        self.forward_report = mp.Event()
-        self.node.register_reporter(self.reporter)
+        # versions of the report values handled already
+        self.report_versions = {}
+        self.report_run = None
+        # draw reports (fps) of the gui side node arrive in this process, no need to go through shared memory
+        self.local_reports = deque(maxlen=100)
+        self.node.register_reporter(self.report_local)
 
-        self.timer = QTimer(self)
-        self.timer.setInterval(16) # max 60fps
-        self.timer.timeout.connect(self.update)
-        self.timer.start()
+        # max 60fps
+        self.render_task = get_render_scheduler().register(self, self.update, 16)
+        self.render_task.on_visibility_changed = self.set_reporting
+
+    def set_reporting(self, enabled):
+        # the executor only serializes the reports of nodes whose debug view is shown
+        logger.debug(f'{"Enabling" if enabled else "Disabling"} reports of {self.node}')
+        self.report_channel.set_enabled(str(self.node), enabled)
     
-    @staticmethod
-    def _rm_numpy(obj):
-        if isinstance(obj, dict):
-            for k, v in obj.items():
-                if isinstance(v, dict):
-                    obj[k] = Debug_View._rm_numpy(v)
-                elif isinstance(v, list):
-                    obj[k] = [Debug_View._rm_numpy(i) for i in v]
-                elif isinstance(v, np.ndarray):
-                    obj[k] = v.tolist()
-        return obj
+    def report_local(self, **kwargs):
+        if self.report_channel.is_enabled(str(self.node)):
+            self.local_reports.append(kwargs)
+
+    def _new_reports(self):
+        # the executor's latest report, split into the values that changed since the last frame
+        reports = list(self.local_reports)
+        self.local_reports.clear()
+        report = self.report_channel.read(str(self.node))
+        if report is None:
+            return reports
+        run, latest = report
+        if run != self.report_run:
+            # written by a new executor (hot restart), its versions start over
+            self.report_run = run
+            self.report_versions = {}
+        for key, (version, val) in latest.items():
+            seen = self.report_versions.get(key, 0)
+            if version == seen:
+                continue
+            self.report_versions[key] = version
+            if key == 'log':
+                # the report holds the tail of the log as (level, text), the version counts all lines
+                lines = list(val)
+                reports.extend({'log': line} for line in lines[len(lines) - min(version - seen, len(lines)):])
+            else:
+                reports.append({key: val})
+        return reports
 
     def update(self):
         # i = 0
@@ -101,9 +218,8 @@ class Debug_View(QWidget):
         fps_str = None
         latency_str = None
         cur_state = None
-        while not self.val_queue.empty():
+        for infos in self._new_reports():
             try:
-                infos = self.val_queue.get_nowait()
                 # i += 1
                 # print(i)
                 if 'fps' in infos:
@@ -113,8 +229,12 @@ class Debug_View(QWidget):
                     latency = infos['latency']
                     latency_str = f'Processing Duration: {latency["process"] * 1000:.5f}ms\nInvocation Interval: {latency["invocation"] * 1000:.5f}ms'
                 if 'log' in infos:
-                    self.log_list.append(infos['log'])
-                    self.log_list = self.log_list[-100:]
+                    # (level, text) from the executor, plain text from the gui side node
+                    log = infos['log']
+                    if isinstance(log, tuple):
+                        self.log.append(log[1], level=log[0])
+                    else:
+                        self.log.append(log)
                 if 'current_state' in infos:
                     cur_state = infos['current_state']
             except Exception as err:
@@ -128,41 +248,23 @@ class Debug_View(QWidget):
         if latency_str is not None:
             # print(latency_str)
             self.metrics.latency.setText(latency_str)
+        if self.metrics.render_label is not None:
+            stats = self.view.render_stats()
+            render_str = f"Render time: {stats['render_ms']:.2f}ms\nRender queue: {stats['queue']} (skipped: {stats['skipped']})"
+            if render_str != self.metrics.render_label.text():
+                self.metrics.render_label.setText(render_str)
         if cur_state is not None:
-            # cur_state_str = json.dumps(cur_state, cls=NumpyEncoder, indent=2)
-            cur_state_str = yaml.dump(self._rm_numpy(cur_state), default_flow_style=False, indent=2)
-            # print(cur_state_str)
-            self.state.setText(cur_state_str)
-        self.log.setText('\n'.join(self.log_list))
-        # print(len('\n'.join(self.log_list)))
+            # applied as delta to the tree, arrays are only summarized for the rows on screen
+            self.state.set_state(cur_state)
+        # all lines of this frame in one edit
+        self.log.flush()
         # print('-------------------')
 
-    def reporter(self, **kwargs):
-        # Try to acquire the lock without blocking
-        if not self.forward_report.is_set():
-            return 
-        
-        # TODO: clean this up and move it into the Time_per_call etc reporters
-        if 'node' in kwargs and 'latency' not in kwargs:
-            processing_duration = self.node._perf_user_fn.average()
-            invocation_duration = self.node._perf_framework.average()
-            kwargs['latency'] = {
-                "process": processing_duration,
-                "invocation": invocation_duration,
-                "time_between_calls": (invocation_duration - processing_duration) * 1000
-            }
-            del kwargs['node']
-        if self.val_queue is not None: 
-            self.val_queue.put(kwargs)
-
-
     def stop(self):
         if self.view is not None:
             self.view.stop()
-        if self.timer is not None:
-            self.timer.stop()
-            self.timer = None
-        if self.val_queue is not None:
-            self.val_queue.close()
-            self.val_queue = None
+        if self.render_task is not None:
+            self.render_task.remove()
+            self.render_task = None
+        self.node.deregister_reporter(self.report_local)
 
@@ -0,0 +1,165 @@
+import os
+import time
+
+from qtpy import QtCore, QtWidgets
+from qtpy.QtCore import QObject, QTimer
+
+from ln_studio.qtpydocking import DockWidget
+
+from ln_studio.utils.stats import Frame_Stats
+
+import logging
+logger = logging.getLogger('LN-Studio')
+
+# one tick per frame drives all views, each tick draws due views until the budget is spent
+FRAME_INTERVAL_MS = int(os.getenv('LNS_FRAME_INTERVAL_MS', 16))
+FRAME_BUDGET_MS = int(os.getenv('LNS_FRAME_BUDGET_MS', 10))
+
+
+class Render_Task():
+    """
+    Handle of a registered draw function, returned by Render_Scheduler.register.
+    """
+
+    def __init__(self, scheduler, widget, fn, interval):
+        self.scheduler = scheduler
+        self.widget = widget
+        self.fn = fn
+        self.interval = interval / 1000
+        self.default_interval = self.interval
+        self.active = True
+        self.last_run = 0
+        # hidden views are skipped without being paused, fn(visible) is called on the first tick and whenever that changes
+        self.visible = None
+        self.on_visibility_changed = None
+        self.stats = Frame_Stats()
+
+    def due(self, now, tolerance=0):
+        # scheduled against a deadline, so that an interval that is not a multiple of the tick is kept on average
+        return now - self.last_run >= self.interval - tolerance
+
+    def ran(self, now):
+        self.last_run += self.interval
+        if now - self.last_run >= self.interval:
+            # fell behind (hidden, over budget), do not catch up with a burst of frames
+            self.last_run = now
+
+    def set_interval(self, interval=None):
+        """
+        Minimum time between two draws in ms, None restores the interval the view registered with.
+        """
+        self.interval = self.default_interval if interval is None else interval / 1000
+
+    def pause(self):
+        self.active = False
+
+    def resume(self):
+        self.active = True
+
+    def remove(self):
+        self.scheduler.unregister(self)
+
+
+class Render_Scheduler(QObject):
+    """
+    Single frame timer calling the draw functions of all views, instead of one QTimer per view.
+
+    Each tick runs the draw functions that are due (their interval passed) until FRAME_BUDGET_MS are spent, the rest waits for the next tick.
+    Views in the dock widget holding the keyboard focus go first, the others are served round-robin, starting after the last one drawn.
+    Views that are not shown (background tab, closed dock, minimized window) are not drawn at all.
+    """
+
+    def __init__(self, interval=FRAME_INTERVAL_MS, budget=FRAME_BUDGET_MS, parent=None):
+        super().__init__(parent)
+        self.budget = budget / 1000
+        # a task due within half a tick runs now instead of one tick late
+        self.tolerance = interval / 2000
+        self.tasks = []
+        self._cursor = 0
+
+        self.timer = QTimer(self)
+        self.timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self._tick)
+
+    def register(self, widget, fn, interval=33):
+        task = Render_Task(self, widget, fn, interval)
+        self.tasks.append(task)
+        if not self.timer.isActive():
+            self.timer.start()
+        return task
+
+    def unregister(self, task):
+        if task in self.tasks:
+            self.tasks.remove(task)
+        if len(self.tasks) == 0:
+            # nothing to draw, do not wake up the event loop
+            self.timer.stop()
+
+    @staticmethod
+    def _focused_dock():
+        widget = QtWidgets.QApplication.focusWidget()
+        while widget is not None and not isinstance(widget, DockWidget):
+            widget = widget.parentWidget()
+        return widget
+
+    @staticmethod
+    def _is_shown(widget):
+        return widget.isVisible() and not widget.window().isMinimized()
+
+    def _update_visibility(self, task):
+        visible = self._is_shown(task.widget)
+        if visible != task.visible:
+            task.visible = visible
+            if task.on_visibility_changed is not None:
+                task.on_visibility_changed(visible)
+
+    def _tick(self):
+        now = time.perf_counter()
+        n = len(self.tasks)
+        if n == 0:
+            return
+
+        # round-robin order, starting after the last task drawn in the previous tick
+        order = [self.tasks[(self._cursor + i) % n] for i in range(n)]
+        dock = self._focused_dock()
+        if dock is not None:
+            order = sorted(order, key=lambda t: not dock.isAncestorOf(t.widget))
+
+        for task in order:
+            try:
+                self._update_visibility(task)
+                if not task.active or not task.visible or not task.due(now, self.tolerance):
+                    continue
+                if time.perf_counter() - now > self.budget:
+                    # the visibility of the remaining tasks is still checked, only drawing is deferred
+                    task.stats.skipped += 1
+                    continue
+                task.ran(now)
+                t = time.perf_counter()
+                task.fn()
+                task.stats.add_update(time.perf_counter() - t)
+            except RuntimeError as err:
+                if 'deleted' in str(err):
+                    # the widget was deleted by qt without being stopped
+                    logger.warning(f'Removing draw function of deleted widget: {err}')
+                    self.unregister(task)
+                    continue
+                logger.exception('Exception in draw function')
+            except Exception:
+                logger.exception('Exception in draw function')
+            if task in self.tasks:
+                self._cursor = (self.tasks.index(task) + 1) % len(self.tasks)
+
+
+_scheduler = None
+
+
+def get_render_scheduler():
+    """
+    The scheduler shared by all views of the application, created on first use (needs a QApplication).
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Render_Scheduler()
+    return _scheduler
@@ -0,0 +1,211 @@
+import numpy as np
+
+from qtpy import QtCore
+from qtpy.QtCore import QAbstractItemModel, QModelIndex
+from qtpy.QtWidgets import QTreeView, QHeaderView
+
+from ln_studio.utils.report_channel import Array_Summary, Truncated
+
+# children shown per container / first array axis, the rest is summarized in one row
+MAX_CHILDREN = 100
+MAX_TEXT = 200
+
+
+class _More():
+    def __init__(self, n):
+        self.n = n
+
+
+class _Item():
+    """
+    Node of the state tree. Children are only created once a view asks for them (ie the row was expanded).
+    """
+    __slots__ = ('parent', 'row', 'key', 'value', 'children', 'summary')
+
+    def __init__(self, parent, row, key, value):
+        self.parent = parent
+        self.row = row
+        self.key = key
+        self.value = value
+        self.children = None
+        self.summary = None
+
+
+def _has_children(value):
+    if isinstance(value, np.ndarray):
+        return value.ndim > 0 and value.size > 0
+    if isinstance(value, Array_Summary):
+        return value.head is not None
+    return isinstance(value, (dict, list, tuple)) and len(value) > 0
+
+
+def _child_values(value):
+    # reduced by the executor, only the first items / rows were sent
+    if isinstance(value, Array_Summary):
+        if value.head is None:
+            # not even a single row fit
+            return []
+        items = list(enumerate(value.head[:MAX_CHILDREN]))
+        if value.shape[0] > len(items):
+            items.append(('…', _More(value.shape[0] - len(items))))
+        return items
+    if isinstance(value, Truncated):
+        items = list(value) if value.kind == 'dict' else list(enumerate(value))
+        items = items[:MAX_CHILDREN]
+        items.append(('…', _More(value.total - len(items))))
+        return items
+    if isinstance(value, dict):
+        items = list(value.items())[:MAX_CHILDREN]
+    elif isinstance(value, (list, tuple)) or (isinstance(value, np.ndarray) and value.ndim > 0):
+        items = list(enumerate(value[:MAX_CHILDREN]))
+    else:
+        return []
+    if len(value) > MAX_CHILDREN:
+        items.append(('…', _More(len(value) - MAX_CHILDREN)))
+    return items
+
+
+def summarize(value):
+    """
+    One line description of a state value. Arrays are described by dtype, shape and range, never converted to lists.
+    """
+    if isinstance(value, _More):
+        return f'{value.n} more'
+    if isinstance(value, np.ndarray):
+        text = f'{value.dtype} {value.shape}'
+        if value.size > 0 and np.issubdtype(value.dtype, np.number):
+            text += f'  min {np.nanmin(value):.6g}  max {np.nanmax(value):.6g}'
+        return text
+    if isinstance(value, Array_Summary):
+        text = f'{value.dtype} {value.shape}'
+        if value.min is not None:
+            text += f'  min {value.min:.6g}  max {value.max:.6g}'
+        return text
+    if isinstance(value, Truncated):
+        return f'{value.kind} ({value.total} keys)' if value.kind == 'dict' else f'{value.kind} ({value.total})'
+    if isinstance(value, dict):
+        return f'dict ({len(value)} keys)'
+    if isinstance(value, (list, tuple)):
+        return f'{type(value).__name__} ({len(value)})'
+    if isinstance(value, (float, np.floating)):
+        return f'{value:.6g}'
+    text = repr(value)
+    return text if len(text) <= MAX_TEXT else text[:MAX_TEXT] + '…'
+
+
+class State_Model(QAbstractItemModel):
+    """
+    Tree model of a node's current state (key / summary columns).
+
+    set_state applies the new state as a delta: values of rows that exist already are replaced in place (dataChanged),
+    rows are only inserted / removed where the structure changed. Summaries are computed when a row is displayed.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = _Item(None, 0, None, {})
+
+    # === Delta updates =================
+    def set_state(self, state):
+        self._set_value(self.root, state if state is not None else {})
+
+    def _set_value(self, item, value):
+        item.value = value
+        item.summary = None
+        if item.children is None:
+            # never displayed, built from the new value once asked for
+            return
+
+        values = _child_values(value)
+        if [c.key for c in item.children] == [k for k, _ in values]:
+            for child, (_, val) in zip(item.children, values):
+                self._set_value(child, val)
+            if len(item.children) > 0:
+                # one signal per level, not per row
+                self.dataChanged.emit(self.createIndex(0, 1, item.children[0]), self.createIndex(len(item.children) - 1, 1, item.children[-1]))
+            return
+
+        # structure changed: replace this level's rows, their children are built lazily again
+        parent = self._index_of(item)
+        if len(item.children) > 0:
+            self.beginRemoveRows(parent, 0, len(item.children) - 1)
+            item.children = []
+            self.endRemoveRows()
+        if len(values) > 0:
+            self.beginInsertRows(parent, 0, len(values) - 1)
+            item.children = self._build_children(item, values)
+            self.endInsertRows()
+
+    @staticmethod
+    def _build_children(item, values):
+        return [_Item(item, row, key, val) for row, (key, val) in enumerate(values)]
+
+    def _children(self, item):
+        if item.children is None:
+            item.children = self._build_children(item, _child_values(item.value))
+        return item.children
+
+    def _item(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    def _index_of(self, item):
+        if item is self.root:
+            return QModelIndex()
+        return self.createIndex(item.row, 0, item)
+
+    # === QAbstractItemModel =================
+    def index(self, row, column, parent=QModelIndex()):
+        children = self._children(self._item(parent))
+        if row < 0 or row >= len(children):
+            return QModelIndex()
+        return self.createIndex(row, column, children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self._index_of(index.internalPointer().parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self._children(self._item(parent)))
+
+    def hasChildren(self, parent=QModelIndex()):
+        item = self._item(parent)
+        if item.children is not None:
+            return len(item.children) > 0
+        return _has_children(item.value)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 2
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or role != QtCore.Qt.DisplayRole:
+            return None
+        item = index.internalPointer()
+        if index.column() == 0:
+            return str(item.key)
+        if item.summary is None:
+            item.summary = summarize(item.value)
+        return item.summary
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return ['Key', 'Value'][section]
+        return None
+
+
+class State_Inspector(QTreeView):
+    """
+    Tree view of a node's current state, expanded rows stay expanded across updates.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.state_model = State_Model(self)
+        self.setModel(self.state_model)
+        self.setUniformRowHeights(True)
+        self.header().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+
+    def set_state(self, state):
+        self.state_model.set_state(state)
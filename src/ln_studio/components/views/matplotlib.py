@@ -1,20 +1,74 @@
 from livenodes import viewer
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
 from matplotlib.figure import Figure
 import matplotlib.pyplot as plt
-from qtpy import QtCore
+from qtpy import QtCore, QtGui
+from qtpy.QtCore import Signal
+from qtpy.QtWidgets import QWidget
 
+import os
+import time
+import queue
+import threading as th
+import numpy as np
 import logging
 logger = logging.getLogger('LN-Studio')
 
 import seaborn as sns
 import darkdetect
 
+from ln_studio.components.render_scheduler import get_render_scheduler
+
+# defaults for nodes that do not set a `blit` / `render_thread` attribute themselves
+BLIT = bool(int(os.getenv('LNS_MPL_BLIT', 0)))
+RENDER_THREAD = bool(int(os.getenv('LNS_MPL_RENDER_THREAD', 0)))
+
+def _style_figure(figure, font):
+    figure.patch.set_facecolor("None")
+    figure.set_facecolor("None")
+    plt.rc('font', **font)
+
+    if darkdetect.isDark():
+        plt.style.use("dark_background")
+    else:
+        sns.set_style("darkgrid")
+    sns.set_context("paper")
+
+
+def _track_new_state(view, node):
+    # marks the view dirty whenever the node hands out new draw state
+    # wraps the unwrapped function, so that a view built again for the same node does not chain onto (and keep alive) the previous one
+    get_current_state = getattr(node, '_untracked_current_state', None) or node.get_current_state
+    node._untracked_current_state = get_current_state
+
+    def tracked_current_state():
+        state = get_current_state()
+        if state:
+            view.dirty = True
+        return state
+
+    node.get_current_state = tracked_current_state
+
+
+def _node_needs_redraw(node):
+    needs_redraw = getattr(node, 'needs_redraw', None)
+    return needs_redraw is not None and needs_redraw()
+
+
 class MPL_View(FigureCanvasQTAgg):
+    """
+    Canvas of a View_MPL node. The figure is only rendered if the node received new draw state since the last frame.
+    Nodes that change their artists without new data (eg on user interaction) can define `needs_redraw()` returning True to request a frame.
+
+    Blitting (opt-in via the node's `blit` attribute or LNS_MPL_BLIT=1): only the artists returned by the node's update function are
+    re-rendered on top of a cached background per axes. The cache is rebuilt on every full draw (resize, theme change, changed axis limits),
+    so everything not returned by the update function (eg titles, legends) only changes when the limits do.
+    """
     
     # max 30 fps and 50 dpi (high could be 100 and 100)
-    def __init__(self, node, figsize=(4, 4), font = {'size': 10}, interval=33, dpi=100):
+    def __init__(self, node, figsize=(4, 4), font = {'size': 10}, interval=33, dpi=100, blit=None):
         super().__init__(Figure(figsize=figsize, dpi=dpi))
 
         if not isinstance(node, viewer.View_MPL):
@@ -22,48 +76,228 @@ class MPL_View(FigureCanvasQTAgg):
 
         self.node = node
 
-        self.figure.patch.set_facecolor("None")
-        self.figure.set_facecolor("None")
-        plt.rc('font', **font)
-
-        if darkdetect.isDark():
-            plt.style.use("dark_background")
-        else:
-            sns.set_style("darkgrid")
-        sns.set_context("paper")
+        _style_figure(self.figure, font)
         
         # https://matplotlib.org/stable/gallery/subplots_axes_and_figures/subfigures.html
         # subfigs = self.figure.subfigures(rows, cols)  #, wspace=1, hspace=0.07)
         # we might create subfigs, but if each node has it's own qwidget, we do not need to and can instead just pass the entire figure
         # https://www.pythonguis.com/tutorials/plotting-matplotlib/
         # https://matplotlib.org/stable/gallery/user_interfaces/embedding_in_qt_sgskip.html
+        # must be wrapped before init_draw, which looks up get_current_state on every update
+        self.dirty = True
+        _track_new_state(self, node)
         self.artist_update_fn = node.init_draw(self.figure)
         self.renderer = self.figure.canvas.get_renderer()
+
+        self.blit_enabled = getattr(node, 'blit', BLIT) if blit is None else blit
+        self._animated = []
+        self._backgrounds = None
+        self._limits = None
+        if self.blit_enabled:
+            self.mpl_connect('draw_event', self._on_draw_event)
         
         self.setFocusPolicy(QtCore.Qt.ClickFocus)
         self.setFocus()
         
         self.show()
         
-        self.timer = QtCore.QTimer()
-        self.timer.setInterval(interval)
-        self.timer.timeout.connect(self.draw_update)
-        self.timer.start()
+        self.render_task = get_render_scheduler().register(self, self.draw_update, interval)
 
 
+    def request_redraw(self):
+        self.dirty = True
+
     def draw_update(self):
         try:
-            self.artist_update_fn(0)
-            self.draw()
+            # cheap if nothing new arrived: the node only checks its draw state
+            artists = self.artist_update_fn(0)
+            if self.dirty or _node_needs_redraw(self.node):
+                self.dirty = False
+                t = time.perf_counter()
+                if self.blit_enabled:
+                    self._blit_update(artists)
+                else:
+                    self.draw()
+                self.render_task.stats.add_draw(time.perf_counter() - t)
         except Exception as err:
             logger.exception('Exception in drawing on canvas')
 
+    # === Blitting =================
+    @staticmethod
+    def _flatten(artists):
+        if artists is None:
+            return []
+        if isinstance(artists, (list, tuple)):
+            return [a for sub in artists for a in MPL_View._flatten(sub)]
+        return [artists]
+
+    def _axes_limits(self):
+        return [(ax.get_xlim(), ax.get_ylim()) for ax in self.figure.axes]
+
+    def invalidate_background(self):
+        self._backgrounds = None
+
+    def _on_draw_event(self, event):
+        if len(self._animated) == 0:
+            # drawn before the node returned its artists (eg by qt on show), they are still part of this image
+            self._backgrounds = None
+            return
+        # a full draw just rendered everything but the animated artists: cache it, then put the artists on top
+        self._backgrounds = {ax: self.copy_from_bbox(ax.bbox) for ax in self.figure.axes}
+        self._limits = self._axes_limits()
+        for artist in self._animated:
+            self.figure.draw_artist(artist)
+
+    def _blit_update(self, artists):
+        self._animated = self._flatten(artists)
+        for artist in self._animated:
+            if not artist.get_animated():
+                # excluded from full draws from now on, but the cached background may still contain it
+                artist.set_animated(True)
+                self.invalidate_background()
+
+        if self._backgrounds is None or self._limits != self._axes_limits():
+            self.draw()
+            return
+
+        for background in self._backgrounds.values():
+            self.restore_region(background)
+        for artist in self._animated:
+            self.figure.draw_artist(artist)
+        for ax in self._backgrounds:
+            self.blit(ax.bbox)
+
+    def resizeEvent(self, event):
+        self.invalidate_background()
+        return super().resizeEvent(event)
+
+    def changeEvent(self, event):
+        if event.type() in (QtCore.QEvent.PaletteChange, QtCore.QEvent.StyleChange):
+            # theme switched, the cached background shows the old colors
+            self.invalidate_background()
+            self.request_redraw()
+        return super().changeEvent(event)
+
     def pause(self):
-        self.timer.stop()
+        self.render_task.pause()
 
     def resume(self):
-        self.timer.start()
+        self.render_task.resume()
     
     def stop(self):
-        self.timer.stop()
+        self.render_task.remove()
+
 
+class MPL_Thread_View(QWidget):
+    """
+    Canvas of a View_MPL node, that renders its figure with Agg in a worker thread (opt-in via the node's `render_thread` attribute or LNS_MPL_RENDER_THREAD=1).
+
+    The render scheduler only queues render requests, the gui thread just paints the last finished image.
+    The node's update function runs in the worker thread as well. No mouse interaction with the figure and no blitting in this mode.
+    """
+    frame_ready = Signal()
+
+    def __init__(self, node, figsize=(4, 4), font = {'size': 10}, interval=33, dpi=100, max_queue=2):
+        super().__init__()
+
+        if not isinstance(node, viewer.View_MPL):
+            raise ValueError('Node must be of Type (MPL) View')
+
+        self.node = node
+        self.dpi = dpi
+        self.max_queue = max_queue
+
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        _style_figure(self.figure, font)
+
+        self.dirty = True
+        _track_new_state(self, node)
+        self.artist_update_fn = node.init_draw(self.figure)
+
+        # last finished frame (rgba), swapped under the lock
+        self._frame = None
+        self._frame_lock = th.Lock()
+        self._rendered_size = None
+        self.render_time = 0
+        self.skipped = 0
+
+        self.requests = queue.Queue()
+        self.frame_ready.connect(self.update)
+        self.worker = th.Thread(target=self._render_loop, name=f"LN-Render {node}", daemon=True)
+        self.worker.start()
+
+        self.render_task = get_render_scheduler().register(self, self.request_render, interval)
+
+    def request_redraw(self):
+        self.dirty = True
+
+    def request_render(self):
+        if self.requests.qsize() >= self.max_queue:
+            # the worker cannot keep up, it renders the newest state once it gets to the queued request anyway
+            self.skipped += 1
+            self.render_task.stats.skipped += 1
+            return
+        self.requests.put((self.width(), self.height(), self.devicePixelRatioF()))
+
+    def render_stats(self):
+        return {
+            'render_ms': self.render_time * 1000,
+            'queue': self.requests.qsize(),
+            'skipped': self.skipped,
+        }
+
+    def _render_loop(self):
+        while True:
+            size = self.requests.get()
+            if size is None:
+                return
+            try:
+                t = time.perf_counter()
+                self.artist_update_fn(0)
+                if not (self.dirty or size != self._rendered_size or _node_needs_redraw(self.node)):
+                    continue
+                self.dirty = False
+
+                width, height, ratio = size
+                self.figure.set_dpi(self.dpi * ratio)
+                self.figure.set_size_inches(max(width, 1) / self.dpi, max(height, 1) / self.dpi, forward=False)
+                self.canvas.draw()
+                frame = np.asarray(self.canvas.buffer_rgba()).copy()
+
+                with self._frame_lock:
+                    self._frame = (frame, ratio)
+                self._rendered_size = size
+                # smoothed, a single slow frame should not dominate the report
+                self.render_time = 0.8 * self.render_time + 0.2 * (time.perf_counter() - t)
+                self.render_task.stats.add_draw(time.perf_counter() - t)
+                self.frame_ready.emit()
+            except Exception:
+                logger.exception('Exception in rendering figure')
+
+    def resizeEvent(self, event):
+        self.request_render()
+        return super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        with self._frame_lock:
+            frame = self._frame
+        if frame is None:
+            return
+        frame, ratio = frame
+        image = QtGui.QImage(frame.data, frame.shape[1], frame.shape[0], frame.shape[1] * 4, QtGui.QImage.Format_RGBA8888)
+        image.setDevicePixelRatio(ratio)
+        painter = QtGui.QPainter(self)
+        painter.drawImage(0, 0, image)
+        painter.end()
+
+    def pause(self):
+        self.render_task.pause()
+
+    def resume(self):
+        self.render_task.resume()
+
+    def stop(self):
+        self.render_task.remove()
+        self.requests.put(None)
+        self.worker.join(1)
@@ -1,7 +1,10 @@
+import time
+
 from livenodes import viewer
 
 from qtpy.QtWidgets import QWidget
-from qtpy.QtCore import QTimer
+
+from ln_studio.components.render_scheduler import get_render_scheduler
 
 class QT_View(QWidget):
     def __init__(self, node, parent=None, interval=33):
@@ -12,24 +15,33 @@ class QT_View(QWidget):
 
         # self.setStyleSheet("QWidget { background-color: 'white' }") 
         self.setProperty("cssClass", "bg-white")
-        artist_update_fn = node.init_draw(self)
+        self.artist_update_fn = node.init_draw(self)
 
-        if artist_update_fn is not None:
-            self.timer = QTimer(self)
-            self.timer.setInterval(interval) # max 100fps
-            self.timer.timeout.connect(artist_update_fn)
-            self.timer.start()
+        self.render_task = None
+        if self.artist_update_fn is not None:
+            # max 30fps, drawn by the shared render scheduler
+            self.render_task = get_render_scheduler().register(self, self.draw_update, interval)
 
         # self.setBackgroundRole(True)
         # p = self.palette()
         # p.setColor(self.backgroundRole(), Qt.white)
         # self.setPalette(p)
 
+    def draw_update(self):
+        t = time.perf_counter()
+        # the node's update returns whether it drew, calls without new state are not frames
+        if self.artist_update_fn():
+            self.render_task.stats.add_draw(time.perf_counter() - t)
+
     def pause(self):
-        self.timer.stop()
+        if self.render_task is not None:
+            self.render_task.pause()
         
     def resume(self):
-        self.timer.start()
+        if self.render_task is not None:
+            self.render_task.resume()
     
     def stop(self):
-        self.timer.stop()
\ No newline at end of file
+        if self.render_task is not None:
+            self.render_task.remove()
+            self.render_task = None
\ No newline at end of file
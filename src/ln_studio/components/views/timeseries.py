@@ -0,0 +1,245 @@
+import time
+
+import numpy as np
+
+from qtpy import QtCore, QtGui
+from qtpy.QtWidgets import QWidget
+
+from ln_studio.viewer import View_Timeseries
+from ln_studio.components.render_scheduler import get_render_scheduler
+
+import logging
+logger = logging.getLogger('LN-Studio')
+
+# matplotlib's tab10, so that channels look the same as in MPL views
+COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+LABEL_WIDTH = 80
+# number of min/max blocks kept per channel, independent of the sample rate
+BLOCKS = 4096
+
+
+def _polyline(points):
+    """
+    QPolygonF from a (n, 2) array. Writes into the polygon's memory directly where the qt binding allows it (PyQt).
+    """
+    poly = QtGui.QPolygonF()
+    try:
+        poly.fill(QtCore.QPointF(), len(points))
+        ptr = poly.data()
+        ptr.setsize(len(points) * 16)
+        np.frombuffer(ptr, dtype=np.float64).reshape(-1, 2)[:] = points
+    except (AttributeError, TypeError):
+        poly = QtGui.QPolygonF([QtCore.QPointF(x, y) for x, y in points])
+    return poly
+
+
+def decimate(lo, hi, columns):
+    """
+    Min/max per column: (channels, n) -> (channels, columns).
+    Drawing every column from its min to its max shows every peak, no matter how many samples fall onto one pixel.
+    """
+    edges = np.linspace(0, lo.shape[1], columns + 1).astype(int)[:-1]
+    return np.minimum.reduceat(lo, edges, axis=1), np.maximum.reduceat(hi, edges, axis=1)
+
+
+class Minmax_History():
+    """
+    The last `samples` samples per channel in a preallocated ring buffer (channels x capacity), newest last.
+    Min/max of every `block` samples are kept alongside on append, so that decimating to pixel columns only touches capacity / block values per channel.
+    """
+
+    def __init__(self, samples, blocks=BLOCKS):
+        self.block = max(int(samples) // blocks, 1)
+        self.capacity = max(int(np.ceil(samples / self.block)), 1) * self.block
+        # allocated once the number of channels is known
+        self.buffer = None
+        self.lo = None
+        self.hi = None
+        self.pos = 0
+        self.filled = 0
+
+    def append(self, data):
+        data = np.asarray(data, dtype=np.float32)
+        if data.ndim == 1:
+            data = data[:, None]
+        data = data.reshape(-1, data.shape[-1])
+        n, channels = data.shape
+
+        if self.buffer is None or self.buffer.shape[0] != channels:
+            self.buffer = np.zeros((channels, self.capacity), dtype=np.float32)
+            self.lo = np.zeros((channels, self.capacity // self.block), dtype=np.float32)
+            self.hi = np.zeros((channels, self.capacity // self.block), dtype=np.float32)
+            self.pos = 0
+            self.filled = 0
+        if n == 0:
+            return
+
+        if n >= self.capacity:
+            data = data[-self.capacity:]
+            n = self.capacity
+        start, end = self.pos, self.pos + n
+        if end <= self.capacity:
+            self.buffer[:, start:end] = data.T
+            self._update_blocks(start, end)
+        else:
+            split = self.capacity - start
+            self.buffer[:, start:] = data[:split].T
+            self.buffer[:, :end - self.capacity] = data[split:].T
+            self._update_blocks(start, self.capacity)
+            self._update_blocks(0, end - self.capacity)
+        self.pos = end % self.capacity
+        self.filled = min(self.filled + n, self.capacity)
+
+    def _update_blocks(self, start, end):
+        # blocks touched by the samples written to [start, end), a partially written last block only covers its new samples
+        first, last = start // self.block, end // self.block
+        if last > first:
+            blocks = self.buffer[:, first * self.block:last * self.block].reshape(self.buffer.shape[0], -1, self.block)
+            self.lo[:, first:last] = blocks.min(axis=2)
+            self.hi[:, first:last] = blocks.max(axis=2)
+        if end > last * self.block:
+            partial = self.buffer[:, last * self.block:end]
+            self.lo[:, last] = partial.min(axis=1)
+            self.hi[:, last] = partial.max(axis=1)
+
+    @staticmethod
+    def _ordered(values, pos, filled, capacity):
+        # oldest to newest, only copies once the ring wrapped
+        if filled < capacity:
+            return values[:, :filled]
+        return np.concatenate((values[:, pos:], values[:, :pos]), axis=1)
+
+    def samples(self):
+        return self._ordered(self.buffer, self.pos, self.filled, self.capacity)
+
+    def envelope(self, width):
+        """
+        x offset and min / max per pixel column of the visible history, None if there are fewer samples than columns.
+        """
+        # the window always spans the full width, a partially filled buffer starts further right
+        x0 = width * (self.capacity - self.filled) / self.capacity
+        columns = int(np.ceil(width * self.filled / self.capacity))
+        if self.filled < 2 * columns:
+            return None
+        n_blocks = self.capacity // self.block
+        pos, filled = -(-self.pos // self.block) % n_blocks, -(-self.filled // self.block)
+        lo = self._ordered(self.lo, pos, filled, n_blocks)
+        hi = self._ordered(self.hi, pos, filled, n_blocks)
+        if lo.shape[1] > columns:
+            lo, hi = decimate(lo, hi, columns)
+        return int(x0), lo, hi
+
+
+class Timeseries_View(QWidget):
+    """
+    Draws View_Timeseries nodes: every channel in its own lane, newest sample on the right.
+
+    The history (plot_window * plot_sample_rate samples per channel) is a Minmax_History, so that decimating to pixel columns on paint is cheap.
+    The min/max envelope is then rasterized with numpy into a single image instead of drawing one long polyline per channel.
+    """
+
+    def __init__(self, node, parent=None, interval=16):
+        super().__init__(parent=parent)
+
+        if not isinstance(node, View_Timeseries):
+            raise ValueError('Node must be of Type View_Timeseries')
+
+        self.node = node
+        self.history = Minmax_History(node.plot_window * node.plot_sample_rate)
+        self.channel_names = []
+
+        self.update_fn = node.init_draw(self)
+        # max 60fps
+        self.render_task = get_render_scheduler().register(self, self.draw_update, interval)
+
+    def draw_update(self):
+        if self.update_fn():
+            self.update()
+
+    def append(self, data, channel_names=None, **kwargs):
+        self.history.append(data)
+        if channel_names is not None:
+            self.channel_names = list(channel_names)
+
+    def _scale(self, lo, hi):
+        # value range per channel, from the node or the visible data
+        channels = lo.shape[0]
+        if self.node.plot_ylim is not None:
+            vmin = np.full(channels, self.node.plot_ylim[0], dtype=np.float32)
+            vmax = np.full(channels, self.node.plot_ylim[1], dtype=np.float32)
+        else:
+            vmin, vmax = lo.min(axis=1), hi.max(axis=1)
+        return vmin[:, None], np.where(vmax > vmin, vmax - vmin, 1)[:, None]
+
+    def _rasterize(self, lo, hi, bounds):
+        """
+        ARGB image of the min/max envelope, one lane per channel between the given row bounds.
+        """
+        channels, columns = lo.shape
+        vmin, span = self._scale(lo, hi)
+        heights = np.diff(bounds)[:, None]
+        # 5% margin top and bottom of each lane
+        top = np.floor(heights * (0.95 - 0.9 * (hi - vmin) / span)).clip(-1, bounds[-1]).astype(np.int16)
+        bottom = np.ceil(heights * (0.95 - 0.9 * (lo - vmin) / span)).clip(-1, bounds[-1]).astype(np.int16)
+        # connect neighbouring columns, otherwise steep edges show up as gaps
+        top[:, 1:] = np.minimum(top[:, 1:], bottom[:, :-1])
+        bottom[:, 1:] = np.maximum(bottom[:, 1:], top[:, :-1])
+
+        pixels = np.empty((bounds[-1], columns), dtype=np.uint32)
+        for i in range(channels):
+            y = np.arange(heights[i, 0], dtype=np.int16)[:, None]
+            # fully transparent outside of the envelope
+            np.multiply((y >= top[i]) & (y <= bottom[i]), np.uint32(QtGui.QColor(COLORS[i % len(COLORS)]).rgba()), out=pixels[bounds[i]:bounds[i + 1]])
+        return pixels
+
+    def _draw_lines(self, painter, width, bounds):
+        # few samples: a polyline per channel, connecting the samples
+        history = self.history
+        samples = history.samples()
+        vmin, span = self._scale(samples, samples)
+        heights = np.diff(bounds)[:, None]
+        points = np.empty(samples.shape + (2,))
+        points[:, :, 0] = LABEL_WIDTH + width * (history.capacity - history.filled + np.arange(history.filled)) / history.capacity
+        points[:, :, 1] = bounds[:-1, None] + heights * (0.95 - 0.9 * (samples - vmin) / span)
+        for i, line in enumerate(points):
+            painter.setPen(QtGui.QPen(QtGui.QColor(COLORS[i % len(COLORS)]), 0))
+            painter.drawPolyline(_polyline(line))
+
+    def paintEvent(self, event):
+        t = time.perf_counter()
+        painter = QtGui.QPainter(self)
+        painter.fillRect(self.rect(), self.palette().base())
+        width = self.width() - LABEL_WIDTH
+        if self.history.buffer is None or self.history.filled == 0 or width <= 0 or self.height() <= 0:
+            painter.setPen(self.palette().text().color())
+            painter.drawText(self.rect(), QtCore.Qt.AlignCenter, 'Waiting for data')
+            painter.end()
+            return
+
+        channels = self.history.buffer.shape[0]
+        bounds = np.round(np.arange(channels + 1) * self.height() / channels).astype(int)
+
+        envelope = self.history.envelope(width)
+        if envelope is None:
+            self._draw_lines(painter, width, bounds)
+        else:
+            x0, lo, hi = envelope
+            pixels = self._rasterize(lo, hi, bounds)
+            image = QtGui.QImage(pixels.data, pixels.shape[1], pixels.shape[0], pixels.shape[1] * 4, QtGui.QImage.Format_ARGB32)
+            painter.drawImage(LABEL_WIDTH + x0, 0, image)
+
+        painter.setPen(self.palette().text().color())
+        for i in range(channels):
+            name = self.channel_names[i] if i < len(self.channel_names) else str(i)
+            painter.drawText(QtCore.QRectF(0, bounds[i], LABEL_WIDTH - 6, bounds[i + 1] - bounds[i]), QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter, name)
+        painter.end()
+        self.render_task.stats.add_draw(time.perf_counter() - t)
+
+    def pause(self):
+        self.render_task.pause()
+
+    def resume(self):
+        self.render_task.resume()
+
+    def stop(self):
+        self.render_task.remove()
@@ -0,0 +1,334 @@
+"""
+Entry point of the LN-Executor process and its gui side handles.
+
+The executor only receives a picklable job description (pipeline path plus ipc handles) and builds the graph itself.
+It must not import any qt or matplotlib modules, so that it can be started with the spawn and forkserver start methods
+and does not inherit the gui's heap when forked.
+
+Executors may be started ahead of time (see Executor_Pool): they import livenodes and all registered node packages
+and then wait for their job on the control pipe.
+"""
+import os
+import time
+import signal
+import logging
+import threading as th
+import traceback
+import multiprocessing as mp
+from enum import IntEnum
+from logging.handlers import QueueHandler, QueueListener
+
+from livenodes import Node, Graph, REGISTRY
+
+from ln_studio.utils.shm_ring import attach_ring_buffer
+from ln_studio.utils.stats import Latency_Histogram
+from ln_studio.utils.node_stats import Node_Stats_Writer
+from ln_studio.utils.connection_stats import Connection_Stats_Writer
+from ln_studio.utils.recording import Connection_Recorder, apply_replay
+from ln_studio.utils.node_hooks import Flush_On_Stop
+from ln_studio.utils.profiler import Profiler_Hook
+
+LOGGER_NAMES = ['LN-Studio', 'livenodes']
+
+# graph.stop_all() waits up to 30s per computer for nodes to stop, give it some headroom before killing the executor
+STOP_TIMEOUT = 60
+
+
+class Control(IntEnum):
+    """
+    Messages on the control pipe between gui and executor, always sent as (Control, payload) tuples.
+    """
+    # gui -> executor
+    START = 0 # payload: job, only sent to pre-started executors
+    STOP = 1
+    # executor -> gui
+    STARTED = 10
+    FINISHED = 11
+    CRASHED = 12 # payload: formatted traceback
+    STOPPED = 13
+
+
+def create_job(pipeline_path, should_time=False, draw_rings=None, reporters=None, node_stats=None, connection_stats=None, recording=None, replay=None, profile=None):
+    """
+    Everything the executor needs to run a pipeline. All values must be picklable.
+
+    draw_rings: str(node) -> SHM_Ring_Buffer the node's draw state is written into
+    reporters: str(node) -> callable registered as reporter on the executor side node
+    node_stats: Node_Stats_Table every node in it adds its process calls to (needs should_time)
+    connection_stats: Connection_Stats_Table the traffic of every connection in it is counted into
+    recording: Recording_Control, the connections in it are recorded while it says so
+    replay: {'path': recording session, 'speed': replay speed (0 = as fast as possible)}, replaces the recorded connections' emitting nodes by the recording
+    profile: Profile_Control, the processes running nodes sample themselves when it requests a profile
+    """
+    return {
+        'pipeline_path': pipeline_path,
+        'cwd': os.getcwd(),
+        'should_time': should_time,
+        'draw_rings': {} if draw_rings is None else draw_rings,
+        'reporters': {} if reporters is None else reporters,
+        'node_stats': node_stats,
+        'connection_stats': connection_stats,
+        'recording': recording,
+        'replay': replay,
+        'profile': profile,
+    }
+
+
+def load_graph(job):
+    pipeline = Node.load(job['pipeline_path'], ignore_connection_errors=False, should_time=job['should_time'])
+    if hasattr(pipeline, 'get_non_macro_node'):
+        pipeline = pipeline.get_non_macro_node()
+    if job.get('replay') is not None:
+        pipeline = apply_replay(pipeline, job['replay'])
+
+    for node in Node.discover_graph(pipeline):
+        name = str(node)
+        if name in job['draw_rings']:
+            attach_ring_buffer(node, job['draw_rings'][name])
+        if name in job['reporters']:
+            reporter = job['reporters'][name]
+            node.register_reporter(reporter)
+            if hasattr(reporter, 'attach'):
+                reporter.attach(node)
+        if job.get('node_stats') is not None and name in job['node_stats'].index:
+            node.register_reporter(Node_Stats_Writer(job['node_stats'], name))
+        if job.get('connection_stats') is not None:
+            writer = Connection_Stats_Writer.for_node(job['connection_stats'], node)
+            if len(writer.outputs) > 0 or len(writer.inputs) > 0:
+                node.register_reporter(writer)
+                writer.attach(node)
+        if job.get('recording') is not None:
+            recorder = Connection_Recorder.for_node(job['recording'], node)
+            if len(recorder.outputs) > 0:
+                recorder.attach(node)
+        if job.get('profile') is not None:
+            hook = Profiler_Hook(job['profile'])
+            node.register_reporter(hook)
+            hook.attach(node)
+
+    return Graph(start_node=pipeline)
+
+
+def _watch_finished(graph, stop_requested, send):
+    # the computers' workers (threads or processes) exit once all their nodes finished
+    for cmp in list(graph.computers):
+        worker = cmp.worker
+        if worker is not None:
+            worker.join()
+    if not stop_requested.is_set():
+        logging.getLogger('LN-Studio').info(f"Worker finished. Waiting for user to return to home screen.")
+        send(Control.FINISHED)
+
+
+def executor_main(job, subprocess_log_queue, conn, log_level=logging.INFO):
+    # ctrl+c reaches the whole process group, the parent decides when to stop and sends STOP, so that the graph is stopped cleanly
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # replace any handlers inherited via fork, the gui process handles all records
+    logging.getLogger().handlers = []
+    for name in LOGGER_NAMES:
+        logger = logging.getLogger(name)
+        logger.handlers = [QueueHandler(subprocess_log_queue)]
+        logger.setLevel(log_level)
+        logger.propagate = False
+    logger = logging.getLogger('LN-Studio')
+
+    send_lock = th.Lock()
+
+    def send(msg, payload=None):
+        with send_lock:
+            try:
+                conn.send((msg, payload))
+            except (BrokenPipeError, OSError):
+                # the gui is gone, nobody to tell
+                pass
+
+    if job is None:
+        # pre-started: pay for the imports now, then wait for the gui to hand us a pipeline
+        logger.info(f"Warming up Worker")
+        REGISTRY.prefetch()
+        try:
+            msg, job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if msg != Control.START:
+            conn.close()
+            return
+
+    logger.info(f"Starting Worker")
+    try:
+        os.chdir(job['cwd'])
+        graph = load_graph(job)
+        graph.start_all()
+    except Exception:
+        logger.exception('Could not start pipeline')
+        send(Control.CRASHED, traceback.format_exc())
+        conn.close()
+        return
+
+    stop_requested = th.Event()
+    th.Thread(target=_watch_finished, args=(graph, stop_requested, send), name="LN-Watcher", daemon=True).start()
+    send(Control.STARTED)
+
+    # block until the gui asks us to stop (or vanished)
+    while True:
+        try:
+            msg, _ = conn.recv()
+        except (EOFError, OSError):
+            logger.warning('Control pipe closed, stopping')
+            break
+        if msg == Control.STOP:
+            break
+
+    stop_requested.set()
+    logger.info(f"Stopping Worker")
+    try:
+        graph.stop_all()
+    except Exception:
+        logger.exception('Could not stop pipeline gracefully')
+        send(Control.CRASHED, traceback.format_exc())
+    send(Control.STOPPED)
+    conn.close()
+    logger.info(f"Worker Stopped")
+
+
+class Executor():
+    """
+    Gui side handle of one LN-Executor process: the process, its control pipe and the listener forwarding its log records.
+    If no job is given the process is pre-started and waits for run() to hand it one.
+    """
+
+    def __init__(self, job=None):
+        self.log_queue = mp.Queue()
+        self.queue_listener = QueueListener(self.log_queue, Forward_To_Logger())
+        self.queue_listener.start()
+
+        self.conn, child_conn = mp.Pipe()
+        log_level = logging.getLogger('livenodes').getEffectiveLevel()
+        self.process = mp.Process(target=executor_main, args=(job, self.log_queue, child_conn, log_level), name="LN-Executor")
+        # self.process.daemon = True # not possible since the node graph might create it's own threads and processes
+        self.process.start()
+        # only the executor may hold the child end, so that we receive an EOF once it exits
+        child_conn.close()
+        self.has_job = job is not None
+        self.started_at = time.time()
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def run(self, job):
+        """
+        Hands a job to a pre-started executor. The job is pickled into the control pipe, the shared memory blocks in it attach by name.
+        Jobs holding handles that can only be inherited (eg the mp.Queue of headless' Stats_Reporter) must start their own Executor(job) instead.
+        """
+        self.conn.send((Control.START, job))
+        self.has_job = True
+        self.started_at = time.time()
+
+    def stop(self, timeout=None):
+        try:
+            self.conn.send((Control.STOP, None))
+        except (BrokenPipeError, OSError):
+            # executor already exited (crashed or finished and closed)
+            pass
+
+        # Block until graph finished all it's nodes
+        self.process.join(timeout)
+        if self.process.is_alive():
+            logging.getLogger('LN-Studio').warning(f"Worker did not stop within {timeout}s. Killing Worker")
+            self.process.terminate()
+            self.process.join()
+
+    def close(self):
+        self.conn.close()
+        self.queue_listener.stop()
+        self.log_queue.close()
+
+
+class Executor_Pool():
+    """
+    Keeps `size` executors started ahead of time, so that launching a pipeline only ships the job instead of starting python and importing all node packages.
+    """
+
+    def __init__(self, size=1):
+        self.size = size
+        self.idle = []
+        self.fill()
+
+    def fill(self):
+        self.idle = [e for e in self.idle if e.is_alive()]
+        while len(self.idle) < self.size:
+            self.idle.append(Executor())
+
+    def acquire(self, job):
+        while len(self.idle) > 0:
+            executor = self.idle.pop(0)
+            if not executor.is_alive():
+                executor.close()
+                continue
+            executor.run(job)
+            return executor
+        return Executor(job)
+
+    def close(self):
+        for executor in self.idle:
+            executor.stop(timeout=1)
+            executor.close()
+        self.idle = []
+
+
+class Stats_Reporter():
+    """
+    Reporter collecting the call counts and process durations of one node in the node's process.
+    Summaries are put into the queue at most every `flush_every` seconds and when the node stops, as (node name, calls, Latency_Histogram).
+    """
+
+    def __init__(self, stats_queue, flush_every=0.5):
+        self.stats_queue = stats_queue
+        self.flush_every = flush_every
+        self.pending = {}
+        self.last_flush = time.time()
+        # nodes computed in threads report from their thread, stop is called from the computer's
+        self._lock = th.Lock()
+
+    def __getstate__(self):
+        return {'stats_queue': self.stats_queue, 'flush_every': self.flush_every}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def attach(self, node):
+        # the last summary would otherwise be lost with the node
+        node.stop = Flush_On_Stop(self, node, node.stop)
+
+    def __call__(self, **kwargs):
+        if 'node' not in kwargs:
+            return
+        node = kwargs['node']
+        name = str(node)
+        with self._lock:
+            if name not in self.pending:
+                self.pending[name] = [0, Latency_Histogram()]
+            self.pending[name][0] += 1
+            # empty unless the node was created with should_time
+            calls = node._perf_user_fn.calls
+            if len(calls) > 0:
+                self.pending[name][1].add(calls[-1])
+
+        if time.time() - self.last_flush > self.flush_every:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.time()
+        for name, (calls, hist) in pending.items():
+            self.stats_queue.put((name, calls, hist))
+
+
+class Forward_To_Logger(logging.Handler):
+    """
+    Hands records received from the executor to the gui process' logger of the same name.
+    """
+
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
@@ -0,0 +1,99 @@
+"""
+Runs a pipeline without any qt widgets, using the same executor lifecycle as the Run page.
+Only depends on livenodes and the executor, so that it works on machines without a display.
+"""
+import os
+import time
+import queue
+import logging
+import multiprocessing as mp
+
+from livenodes import Node
+
+from ln_studio.executor import create_job, Executor, Control, Stats_Reporter, STOP_TIMEOUT
+from ln_studio.utils.stats import Latency_Histogram
+
+logger = logging.getLogger('LN-Studio')
+
+
+def _drain(stats_queue, stats):
+    while True:
+        try:
+            name, calls, hist = stats_queue.get_nowait()
+        except queue.Empty:
+            return
+        if name not in stats:
+            stats[name] = [0, Latency_Histogram()]
+        stats[name][0] += calls
+        stats[name][1].merge(hist)
+
+
+def format_stats(stats, duration):
+    """
+    One line per node: calls, throughput and process duration percentiles.
+    """
+    lines = [f"{'Node':<40} {'calls':>8} {'calls/s':>9} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+    for name, (calls, hist) in sorted(stats.items()):
+        lines.append(f"{name:<40} {calls:>8} {calls / max(duration, 1e-9):>9.2f} {hist.mean() * 1000:>9.3f} "
+                     f"{hist.percentile(50) * 1000:>9.3f} {hist.percentile(99) * 1000:>9.3f} {hist.max * 1000:>9.3f}")
+    return '\n'.join(lines)
+
+
+def run_headless(project_path, pipeline_path, duration=None):
+    """
+    Runs the pipeline until it finishes, crashes, `duration` seconds passed or the user interrupts (ctrl+c).
+    Prints per node throughput and latency stats on exit, returns False if the pipeline crashed.
+    """
+    os.chdir(project_path)
+    logger.info(f'Running headless: {project_path}/{pipeline_path}')
+
+    # only needed for the node names, the executor loads its own graph
+    pipeline = Node.load(pipeline_path, ignore_connection_errors=False)
+    if hasattr(pipeline, 'get_non_macro_node'):
+        pipeline = pipeline.get_non_macro_node()
+
+    stats_queue = mp.Queue()
+    # one per node, nodes computed in different threads of one process must not share the pending counts
+    reporters = {str(n): Stats_Reporter(stats_queue) for n in Node.discover_graph(pipeline)}
+    job = create_job(pipeline_path, should_time=True, reporters=reporters)
+
+    stats = {}
+    ok = True
+    started_at = None
+    executor = Executor(job)
+    try:
+        while True:
+            _drain(stats_queue, stats)
+            if started_at is not None and duration is not None and time.time() - started_at >= duration:
+                logger.info(f'Duration of {duration}s reached')
+                break
+            if not executor.conn.poll(0.1):
+                continue
+            try:
+                msg, payload = executor.conn.recv()
+            except (EOFError, OSError):
+                break
+            if msg == Control.STARTED:
+                started_at = time.time()
+                logger.info(f'Pipeline started {started_at - executor.started_at:.2f}s after launch')
+            elif msg == Control.FINISHED:
+                logger.info('Pipeline finished')
+                break
+            elif msg == Control.CRASHED:
+                logger.error(f'Pipeline crashed:\n{payload}')
+                ok = False
+                break
+    except KeyboardInterrupt:
+        logger.info('Interrupted')
+
+    ran_for = time.time() - started_at if started_at is not None else 0
+    executor.stop(STOP_TIMEOUT)
+    executor.close()
+    # the reporters flush periodically, give the queue's feeder threads a moment to deliver the last summaries
+    time.sleep(0.1)
+    _drain(stats_queue, stats)
+    stats_queue.close()
+
+    print(f'Ran for {ran_for:.2f}s')
+    print(format_stats(stats, ran_for))
+    return ok
@@ -1,10 +1,25 @@
+import os
+import threading as th
+import logging
+
 from qtpy import QtWidgets, QtCore
+from qtpy.QtCore import Signal
+
+from livenodes import Node, viewer
+
+from ln_studio.utils import pipeline_cache
+from ln_studio.utils.shm_ring import attach_ring_buffer
+from ln_studio.components.node_views import node_view_mapper
+
+logger = logging.getLogger('LN-Studio')
 
 class LoadingWindow(QtWidgets.QWidget):
+    cancelled = Signal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Loading")
-        self.setFixedSize(400, 100)
+        self.setFixedSize(400, 130)
         self.setWindowFlags(QtCore.Qt.WindowStaysOnTopHint | QtCore.Qt.FramelessWindowHint)
 
         layout = QtWidgets.QVBoxLayout()
@@ -19,13 +34,18 @@ class LoadingWindow(QtWidgets.QWidget):
 
         # Add loading bar
         self.loading_bar = QtWidgets.QProgressBar(self)
-        self.loading_bar.setRange(0, 0)  # Determinate mode
+        self.loading_bar.setRange(0, 0)  # Indeterminate mode until the first progress is known
         layout.addWidget(self.loading_bar)
 
         # Add status text
         self.status_label = QtWidgets.QLabel(self)
         layout.addWidget(self.status_label)
 
+        # Add cancel button
+        self.cancel_button = QtWidgets.QPushButton("Cancel", self)
+        self.cancel_button.clicked.connect(self._on_cancel)
+        layout.addWidget(self.cancel_button)
+
         self.setLayout(layout)
 
         # Center the window on the screen
@@ -40,4 +60,114 @@ class LoadingWindow(QtWidgets.QWidget):
     def update_status(self, status):
         self.status_label.setText(status)
 
-        
\ No newline at end of file
+    def update_progress(self, value, maximum):
+        self.loading_bar.setRange(0, maximum)
+        self.loading_bar.setValue(value)
+
+    def _on_cancel(self):
+        self.cancel_button.setDisabled(True)
+        self.update_status('Cancelling...')
+        self.cancelled.emit()
+
+
+class Pipeline_Loader(QtCore.QObject):
+    """
+    Loads a pipeline (and thereby imports all node packages it uses) and discovers its graph in a background thread.
+    The gui is only notified through the signals, which qt queues into the gui thread.
+    Loading cannot be interrupted, cancel() discards its result instead.
+    """
+    progress = Signal(str)
+    loaded = Signal(object, object) # pipeline (non macro), discovered nodes
+    failed = Signal(str)
+
+    def __init__(self, pipeline_path, should_time=False, parent=None):
+        super().__init__(parent)
+        # absolute, as the gui may change the working directory back if loading is cancelled
+        self.pipeline_path = os.path.abspath(pipeline_path)
+        self.should_time = should_time
+        self._cancelled = th.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = th.Thread(target=self._load, name="LN-Loader", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def _load(self):
+        try:
+            self.progress.emit('Loading pipeline and node packages')
+            # TODO: open dialog/show textbox showing all connection errors as list
+            pipeline = pipeline_cache.load_pipeline(self.pipeline_path, ignore_connection_errors=False, should_time=self.should_time)
+            if self.is_cancelled():
+                return
+
+            self.progress.emit('Discovering graph')
+            if hasattr(pipeline, 'get_non_macro_node'):
+                pipeline = pipeline.get_non_macro_node()
+            nodes = Node.discover_graph(pipeline)
+        except Exception as err:
+            logger.exception('Could not load pipeline.')
+            if not self.is_cancelled():
+                self.failed.emit(str(err))
+            return
+
+        if not self.is_cancelled():
+            self.loaded.emit(pipeline, nodes)
+
+
+class View_Builder(QtCore.QObject):
+    """
+    Creates the views of a loaded pipeline's View nodes on the gui thread, one per event loop turn.
+    In between the loading window stays responsive (and its cancel button works) without running a nested event loop while a view is half built.
+    Each node's draw ring is attached right before its view, which wraps the node's draw state getter.
+    """
+    progress = Signal(int, int)
+    finished = Signal(object, object) # draw rings, views (both by str(node))
+    failed = Signal(str)
+
+    def __init__(self, nodes, parent=None):
+        super().__init__(parent)
+        self.nodes = [n for n in nodes if isinstance(n, viewer.View)]
+        self.draw_rings = {}
+        self.views = {}
+        self._cancelled = False
+
+    def start(self):
+        QtCore.QTimer.singleShot(0, self._build_next)
+
+    def cancel(self):
+        self._cancelled = True
+
+    def _build_next(self):
+        if self._cancelled:
+            self._discard()
+            return
+        if len(self.views) == len(self.nodes):
+            self.finished.emit(self.draw_rings, self.views)
+            return
+
+        node = self.nodes[len(self.views)]
+        try:
+            self.draw_rings[str(node)] = attach_ring_buffer(node)
+            # the page reparents the view into its dock
+            self.views[str(node)] = node_view_mapper(None, node)
+        except Exception as err:
+            logger.exception(f'Could not create view for {node}')
+            self._discard()
+            self.failed.emit(str(err))
+            return
+        self.progress.emit(len(self.views), len(self.nodes))
+        QtCore.QTimer.singleShot(0, self._build_next)
+
+    def _discard(self):
+        for view in self.views.values():
+            if hasattr(view, 'stop'):
+                view.stop()
+        for ring in self.draw_rings.values():
+            ring.close()
+        self.views, self.draw_rings = {}, {}
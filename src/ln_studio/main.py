@@ -1,6 +1,5 @@
 import sys
 import multiprocessing as mp
-import platform
 from qtpy import QtWidgets, QtCore, QtGui
 import darkdetect
 import qdarktheme
@@ -12,6 +11,8 @@ from ln_studio.pages.config import Config
 from ln_studio.pages.run import Run
 from ln_studio.pages.debug import Debug
 from ln_studio.components.page_parent import Parent
+from ln_studio.loading import LoadingWindow, Pipeline_Loader, View_Builder
+from ln_studio.executor import Executor_Pool
 from livenodes.node import Node
 from livenodes import REGISTRY
 
@@ -36,7 +37,7 @@ class View_Creation_Error(Exception):
 
 class MainWindow(QtWidgets.QMainWindow):
 
-    def __init__(self, state_handler, parent=None, home_dir=os.getcwd(), _on_close_cb=noop):
+    def __init__(self, state_handler, parent=None, home_dir=os.getcwd(), _on_close_cb=noop, executor_pool=None):
         super(MainWindow, self).__init__(parent)
 
         self.logger = logging.getLogger('LN-Studio')
@@ -66,6 +67,9 @@ class MainWindow(QtWidgets.QMainWindow):
         # self.resized.connect(self.widget_home.refresh_selection)
 
         self.logging_handler = None
+        self.loading_window = None
+        self.loader = None
+        self.view_builder = None
 
         self.home_dir = home_dir
         self.logger.info(f'Home Dir: {home_dir}')
@@ -73,6 +77,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self._on_close_cb = _on_close_cb
         self.state_handler = state_handler
+        self.executor_pool = executor_pool
 
         # for some fucking reason i cannot figure out how to set the css class only on the home class... so hacking this by adding and removign the class on view change...
         # self.central_widget.setProperty("cssClass", "home")
@@ -116,7 +121,12 @@ class MainWindow(QtWidgets.QMainWindow):
                 self.state_handler[section_name] = {}
             view.save_state(self.state_handler[section_name])
 
+    def is_loading(self):
+        return self.loading_window is not None
+
     def return_home(self):
+        if self.is_loading():
+            return
         cur = self.central_widget.currentWidget()
         self._save_state(cur)
         self.stop()
@@ -135,84 +145,108 @@ class MainWindow(QtWidgets.QMainWindow):
             obj.stop()
 
     def onstart(self, project_path, pipeline_path):
-        self._save_state(self.widget_home)
-        os.chdir(project_path)
+        if self.is_loading():
+            return
         self.logger.info(f'Running: {project_path}/{pipeline_path}')
-        self.logger.info(f'CWD: {os.getcwd()}')
-
-        try:
-            try:
-                # TODO: open dialog/show textbox showing all connection errors as list
-                pipeline = Node.load(pipeline_path, ignore_connection_errors=False)
-            except:
-                self.logger.exception('Could not load pipeline.')
-                raise Pipeline_Loading_Error()
-
-            child, widget_run = None, None
-            try:
-                # TODO: make these logs project dependent as well
-                child = Run(pipeline=pipeline, pipeline_path=pipeline_path)
-                widget_run = Parent(child=child,
-                                    name=f"Running: {pipeline_path}",
-                                    back_fn=self.return_home)
-            except:
-                self._call_stop(child)
-                self._call_stop(widget_run)
-                self.logger.exception('Could not create view.')
-                raise View_Creation_Error()
-            
-            self.central_widget.addWidget(widget_run)
-            self.central_widget.setCurrentWidget(widget_run)
-
-            self._set_state(widget_run)
-        except Exception as err:
-            self.logger.error(err)
-            self.logger.exception('Staying home')
-            self.stop()
-            os.chdir(self.home_dir)
-            self.logger.info(f'CWD: {os.getcwd()}')
+        create_child = lambda pipeline, nodes, draw_rings, views: Run(pipeline=pipeline, pipeline_path=pipeline_path, executor_pool=self.executor_pool,
+                                                                      nodes=nodes, draw_rings=draw_rings, views=views)
+        self._load_pipeline(project_path, pipeline_path, create_child, name=f"Running: {pipeline_path}", build_views=True)
 
     def ondebug(self, project_path, pipeline_path):
+        if self.is_loading():
+            return
+        self.logger.info(f'Debugging: {project_path}/{pipeline_path}')
+        # the debug page builds each view the first time its dock is shown
+        create_child = lambda pipeline, nodes, draw_rings, views: Debug(pipeline=pipeline, pipeline_path=pipeline_path, node_registry=REGISTRY,
+                                                                        executor_pool=self.executor_pool, nodes=nodes)
+        self._load_pipeline(project_path, pipeline_path, create_child, name=f"Debuging: {pipeline_path}", should_time=True)
+
+    def _load_pipeline(self, project_path, pipeline_path, create_child, name, should_time=False, build_views=False):
+        # loading imports all node packages the pipeline uses, which may take a while -> do it off the gui thread
         self._save_state(self.widget_home)
         os.chdir(project_path)
-        self.logger.info(f'Debugging: {project_path}/{pipeline_path}')
         self.logger.info(f'CWD: {os.getcwd()}')
 
+        self.widget_home.setDisabled(True)
+        self.loading_window = LoadingWindow()
+        self.loading_window.update_status('Loading pipeline')
+        self.loading_window.show()
+
+        self.loader = Pipeline_Loader(pipeline_path, should_time=should_time, parent=self)
+        self.loader.progress.connect(self.loading_window.update_status)
+        self.loader.loaded.connect(partial(self._on_pipeline_loaded, create_child, name, build_views))
+        self.loader.failed.connect(self._on_loading_failed)
+        self.loading_window.cancelled.connect(self._on_loading_cancelled)
+        self.loader.start()
+
+    def _on_pipeline_loaded(self, create_child, name, build_views, pipeline, nodes):
+        if self.loader.is_cancelled():
+            return
+        self.loading_window.update_status('Creating views')
+        # views can only be created on the gui thread, the builder creates one per event loop turn so that the loading window stays responsive
+        self.view_builder = View_Builder(nodes if build_views else [], parent=self)
+        self.view_builder.progress.connect(self.loading_window.update_progress)
+        self.view_builder.finished.connect(partial(self._on_views_built, create_child, name, pipeline, nodes))
+        self.view_builder.failed.connect(self._on_view_creation_failed)
+        self.view_builder.start()
+
+    def _on_views_built(self, create_child, name, pipeline, nodes, draw_rings, views):
+        self.view_builder = None
+        child, widget_run = None, None
         try:
-            try:
-                # TODO: open dialog/show textbox showing all connection errors as list
-                pipeline = Node.load(pipeline_path, ignore_connection_errors=False, should_time=True)
-            except:
-                self.logger.exception('Could not load pipeline.')
-                raise Pipeline_Loading_Error()
-
-            child, widget_run = None, None
-            try:
-                # TODO: make these logs project dependent as well
-                child = Debug(pipeline=pipeline, pipeline_path=pipeline_path, 
-                                            node_registry=REGISTRY)
-                widget_run = Parent(child=child,
-                                name=f"Debuging: {pipeline_path}",
-                                back_fn=self.return_home)
-            except:
-                self._call_stop(child)
-                self._call_stop(widget_run)
-                self.logger.exception('Could not create view.')
-                raise View_Creation_Error()
-            
-            self.central_widget.addWidget(widget_run)
-            self.central_widget.setCurrentWidget(widget_run)
-
-            self._set_state(widget_run)
-        except Exception as err:
+            # TODO: make these logs project dependent as well
+            child = create_child(pipeline, nodes, draw_rings, views)
+            widget_run = Parent(child=child, name=name, back_fn=self.return_home)
+        except:
+            self._call_stop(child)
+            self._call_stop(widget_run)
+            self.logger.exception('Could not create view.')
+            self._on_view_creation_failed()
+            return
+
+        self._close_loading()
+        self.central_widget.addWidget(widget_run)
+        self.central_widget.setCurrentWidget(widget_run)
+
+        self._set_state(widget_run)
+
+    def _on_loading_failed(self, msg):
+        self._close_loading()
+        self._stay_home(Pipeline_Loading_Error(msg))
+
+    def _on_view_creation_failed(self, msg=None):
+        self.view_builder = None
+        self._close_loading()
+        self._stay_home(View_Creation_Error())
+
+    def _on_loading_cancelled(self):
+        self.logger.info('Loading cancelled')
+        # the loader thread cannot be interrupted, it discards its result once it returns
+        self.loader.cancel()
+        if self.view_builder is not None:
+            # stops before its next view and closes the ones built so far
+            self.view_builder.cancel()
+            self.view_builder = None
+        self._close_loading()
+        self._stay_home()
+
+    def _close_loading(self):
+        if self.loading_window is not None:
+            self.loading_window.close()
+            self.loading_window = None
+        self.widget_home.setDisabled(False)
+
+    def _stay_home(self, err=None):
+        if err is not None:
             self.logger.error(err)
-            self.logger.exception('Staying home')
-            self.stop()
-            os.chdir(self.home_dir)
-            self.logger.info(f'CWD: {os.getcwd()}')
-
+            self.logger.error('Staying home')
+        self.stop()
+        os.chdir(self.home_dir)
+        self.logger.info(f'CWD: {os.getcwd()}')
 
     def onconfig(self, project_path, pipeline_path):
+        if self.is_loading():
+            return
         self._save_state(self.widget_home)
         os.chdir(project_path)
         self.logger.info(f'Configuring: {project_path}/{pipeline_path}')
@@ -272,10 +306,13 @@ def dark_mode_callback(app):
     )
 
 
-@click.command()
+@click.group(invoke_without_command=True)
 @click.option('--profile', is_flag=True, help='Enable profiling')
 @click.option('--qss-debug', is_flag=True, help='Enable QSS debugging')
-def main(profile=False, qss_debug=False):
+@click.option('--start-method', type=click.Choice(['spawn', 'forkserver', 'fork']), default='spawn', help='Multiprocessing start method of the pipeline executor')
+@click.option('--executor-pool', type=int, default=1, help='Number of pipeline executors to start ahead of time, 0 to disable')
+@click.pass_context
+def main(ctx, profile=False, qss_debug=False, start_method='spawn', executor_pool=1):
     # === Load environment variables ========================================================================
     import os
 
@@ -288,20 +325,43 @@ def main(profile=False, qss_debug=False):
     logger_stdout_handler.setFormatter(formatter)
     logger_root.addHandler(logger_stdout_handler)
 
+    logger = logging.getLogger('LN-Studio')
+
+    # === Multiprocessing ========================================================================
+    # the executor only receives picklable handles (see ln_studio.executor), so any start method works.
+    # spawn is the default, as it does not copy the gui's qt/matplotlib heap into the executor and is available on all platforms
+    mp.set_start_method(start_method, force=True)
+    logger.info(f"Multiprocessing start method: {start_method}")
+
+    ctx.obj = dict(profile=profile, qss_debug=qss_debug, executor_pool=executor_pool)
+    if ctx.invoked_subcommand is None:
+        start_gui(**ctx.obj)
+
+
+@main.command()
+@click.argument('project', type=click.Path(exists=True, file_okay=False))
+@click.argument('pipeline')
+@click.option('--headless', is_flag=True, help='Run without any windows and print throughput and latency stats on exit')
+@click.option('--duration', type=float, default=None, help='Stop the pipeline after this many seconds (headless only)')
+@click.pass_context
+def run(ctx, project, pipeline, headless=False, duration=None):
+    """
+    Run PIPELINE (path relative to PROJECT) directly.
+    """
+    if headless:
+        from ln_studio.headless import run_headless
+        sys.exit(0 if run_headless(project, pipeline, duration=duration) else 1)
+    start_gui(**ctx.obj, pipeline=(os.path.abspath(project), pipeline))
+
+
+def start_gui(profile=False, qss_debug=False, executor_pool=1, pipeline=None):
     logger = logging.getLogger('LN-Studio')
     home_dir = os.getcwd()
 
     logger.info(f"Projects folders: {STATE['View.Home']['folders']}")
 
-    # === Fix MacOS specifics ========================================================================
-    # this fix is for macos (https://docs.python.org/3.8/library/multiprocessing.html#contexts-and-start-methods)
-    if platform.system() == 'Darwin':
-        mp.set_start_method(
-            'fork',
-            force=True)  # force=True doesn't seem like a too good idea, but hey
-    # IMPORTANT TODO: 'spawn' fails due to objects not being picklable (which makes sense)
-    # -> however, fork is not present on windows and more generally the python community seems to shift towards making spawn the default/expected behaviour
-    # -> resulting in the TODO: check and then separate qt views from the actuall running pipeline such that we can safely switch to spawn for all subprocesses.
+    # start executors now, so that python and the node packages are imported by the time the user starts a pipeline
+    pool = Executor_Pool(executor_pool) if executor_pool > 0 else None
 
     # === Setup application ========================================================================
     qdarktheme.enable_hi_dpi() # must be set before the application is created
@@ -326,6 +386,9 @@ def main(profile=False, qss_debug=False):
             write_state()
         except:
             logger.error('Could not gracfully write application state')
+
+        if pool is not None:
+            pool.close()
         
         if profile:
             print('-----------------')
@@ -352,7 +415,7 @@ def main(profile=False, qss_debug=False):
     sys.excepthook = handle_exception
 
     # === Create main window ========================================================================
-    window = MainWindow(state_handler=STATE, home_dir=home_dir, _on_close_cb=onclose)
+    window = MainWindow(state_handler=STATE, home_dir=home_dir, _on_close_cb=onclose, executor_pool=pool)
     window.resize(*window_state.get('size', (1400, 820)))
     window.setWindowTitle("LN-Studio")
 
@@ -363,6 +426,9 @@ def main(profile=False, qss_debug=False):
     
     window.show()
 
+    if pipeline is not None:
+        window.onstart(*pipeline)
+
     if profile:
         import cProfile
         import pstats
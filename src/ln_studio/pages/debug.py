@@ -3,50 +3,96 @@ import os
 
 from qtpy.QtWidgets import QHBoxLayout
 from qtpy import QtCore, QtWidgets
-from qtpy.QtWidgets import QPushButton, QVBoxLayout, QHBoxLayout
+from qtpy.QtWidgets import QPushButton, QVBoxLayout, QHBoxLayout, QComboBox, QFileDialog, QMessageBox
 
 # from PyQtAds import QtAds
 from ln_studio.qtpydocking import DockManager, DockWidget, DockWidgetArea
 from ln_studio.qtpydocking.enums import DockWidgetFeature
 
 import multiprocessing as mp
+from functools import partial
 
-from livenodes import Node, Graph, viewer
-from ln_studio.components.node_views import node_view_mapper, Debug_View
+from livenodes import Node, viewer
+from ln_studio.executor import create_job
+from ln_studio.utils.report_channel import Report_Channel
+from ln_studio.utils.node_stats import Node_Stats_Table
+from ln_studio.utils.connection_stats import Connection_Stats_Table
+from ln_studio.utils.recording import Recording_Control
+from ln_studio.utils.profiler import Profile_Control, merge, node_shares
+from ln_studio.components.node_views import node_view_mapper, Lazy_Debug_View
 from ln_studio.components.page import Page, Action, ActionKind
 
 from qtpy.QtWidgets import QSplitter, QHBoxLayout
 
 from ln_studio.components.edit_graph import QT_Graph_edit
+from ln_studio.components.node_heatmap import Node_Heatmap, connection_key
+from ln_studio.qtpynodeeditor.connection_graphics_object import ConnectionGraphicsObject
 from ln_studio.components.page import ActionKind, Page, Action
 from .run import Run
 
+REPLAY_SPEEDS = [('1×', 1), ('2×', 2), ('5×', 5), ('10×', 10), ('ASAP', 0)]
+# seconds the executor is sampled per click on Profile
+PROFILE_SECONDS = float(os.getenv('LNS_PROFILE_SECONDS', 10))
+
 class Debug(Run, Page):
 
-    def __init__(self, pipeline_path, pipeline, node_registry, parent=None):
+    def __init__(self, pipeline_path, pipeline, node_registry, executor_pool=None, nodes=None, parent=None):
         super(Page, self).__init__(parent=parent)
 
         if hasattr(pipeline, 'get_non_macro_node'):
             pipeline = pipeline.get_non_macro_node()
 
         self.pipeline = pipeline
-        self.graph = Graph(start_node=pipeline)
         self.pipeline_path = pipeline_path
         self.pipeline_gui_path = pipeline_path.replace('.yml', '_gui_dock_debug.xml')
+        # shared with the run page, a view's frame rate does not depend on debugging
+        self.pipeline_fps_path = pipeline_path.replace('.yml', '_gui_fps.json')
+        self.fps_caps = self._load_fps_caps()
+        self.pipeline_frame_stats_path = pipeline_path.replace('.yml', '_frame_stats_debug.csv')
+        self.pipeline_recordings_path = pipeline_path.replace('.yml', '_recordings')
+        self.pipeline_profiles_path = pipeline_path.replace('.yml', '_profiles')
+        # {'path': session, 'speed': x} while a recording is replayed instead of running live
+        self.replay = None
+        self.frame_overlays = []
+        self.frame_stats = {}
 
         self.worker = None
+        self.executor_pool = executor_pool
         self.logger = logging.getLogger("LN-Studio")
 
         # === Setup Start/Stop =================================================
         self.start_btn = QPushButton("Start")
-        self.start_btn.clicked.connect(self._start_pipeline)
+        self.start_btn.clicked.connect(self._start_live)
         self.stop_btn = QPushButton("Stop")
-        self.stop_btn.clicked.connect(self._stop_pipeline)
+        self.stop_btn.clicked.connect(self._stop_executor)
         self.stop_btn.setDisabled(True)
 
+        # === Setup Record/Replay =================================================
+        self.record_btn = QPushButton("Record")
+        self.record_btn.setCheckable(True)
+        self.record_btn.setToolTip("Record the connections selected in the graph (all if none are selected)")
+        self.record_btn.setDisabled(True)
+        self.record_btn.toggled.connect(self._toggle_recording)
+        self.replay_speed = QComboBox()
+        for label, speed in REPLAY_SPEEDS:
+            self.replay_speed.addItem(label, speed)
+        self.replay_btn = QPushButton("Replay")
+        self.replay_btn.setToolTip("Run the pipeline with a recording in place of the recorded connections' sources")
+        self.replay_btn.clicked.connect(self._start_replay)
+
+        # === Setup Profile =================================================
+        self.profile_btn = QPushButton("Profile")
+        self.profile_btn.setToolTip(f"Sample the pipeline's processes for {PROFILE_SECONDS:.0f}s, exported as collapsed stacks and speedscope json")
+        self.profile_btn.setDisabled(True)
+        self.profile_btn.clicked.connect(self._start_profile)
+
         buttons = QHBoxLayout()
         buttons.addWidget(self.start_btn)
         buttons.addWidget(self.stop_btn)
+        buttons.addWidget(self.record_btn)
+        buttons.addWidget(self.replay_speed)
+        buttons.addWidget(self.replay_btn)
+        buttons.addWidget(self.profile_btn)
 
         # === Setup Edit Side =================================================
         self.edit_graph = QT_Graph_edit(pipeline_path=pipeline_path, node_registry=node_registry, parent=self, read_only=True, resolve_macros=True)
@@ -55,18 +101,37 @@ class Debug(Run, Page):
 
         # === Setup draw canvases and add items to views =================================================
         self.dock_manager = DockManager(self)
-        self.nodes = Node.discover_graph(pipeline)
-        self.draw_widgets = [Debug_View(n, view=node_view_mapper(self, n) if isinstance(n, viewer.View) else None, parent=self) for n in self.nodes]
+        self.nodes = nodes if nodes is not None else Node.discover_graph(pipeline)
+        self._attach_draw_rings(self.nodes)
+        # no view reads them until its dock is shown and the view is built
+        for ring in self.draw_rings.values():
+            ring.set_paused(True)
+        # one shared memory block for the reports of all nodes
+        self.report_channel = Report_Channel([str(n) for n in self.nodes])
+        # placeholders only, each node's debug view is built the first time its dock is shown
+        self.draw_widgets = []
+        for n in self.nodes:
+            make_view = partial(node_view_mapper, self, n) if isinstance(n, viewer.View) else None
+            self.draw_widgets.append(Lazy_Debug_View(n, self.report_channel, make_view=make_view, parent=self))
 
         for widget, node in zip(self.draw_widgets, self.nodes):
             name = node.get_name_resolve_macro() if hasattr(node, "get_name_resolve_macro") else node.name
             dock_widget = DockWidget(name)
             dock_widget.set_widget(widget)
             dock_widget.set_feature(DockWidgetFeature.closable, False)
+            widget.built.connect(partial(self._on_debug_view_built, dock_widget, name, node))
+            widget.torn_down.connect(partial(self._on_debug_view_torn_down, dock_widget, node))
             self.dock_manager.add_dock_widget_tab(DockWidgetArea.center, dock_widget)
             self.logger.info('Added dock widget for node: ' + name)
 
         self._load_layout_dock(self.pipeline_gui_path)
+
+        # === Live load of every node on the graph =================================================
+        self.node_stats = Node_Stats_Table([str(n) for n in self.nodes])
+        self.connection_stats = Connection_Stats_Table([c.serialize_compact() for n in self.nodes for c in n.input_connections])
+        self.recording = Recording_Control(self.connection_stats.keys, self.pipeline_recordings_path)
+        self.profile = Profile_Control(self.pipeline_profiles_path)
+        self.heatmap = Node_Heatmap(self.edit_graph, self.node_stats, self.connection_stats)
         
         # === Create overall layout =================================================
         grid = QSplitter()
@@ -80,9 +145,7 @@ class Debug(Run, Page):
         layout.addWidget(grid)
 
         # === Start pipeline =================================================
-        self.worker_term_lock = mp.Lock()
-        self.worker_stopped_lock = mp.Lock()
-        self.worker = None
+        self._connect_control_signals()
 
     def _load_layout_dock(self, path):
         if os.path.exists(path):
@@ -97,19 +160,104 @@ class Debug(Run, Page):
         else:
             self.logger.warning('No saved layout found at: ' + path)
 
+    def _on_debug_view_built(self, dock_widget, name, node, widget):
+        if widget.view is not None:
+            self._add_view_actions(dock_widget, name, widget.view)
+            self._suspend_hidden_views([(node, widget.view)])
+
+    def _on_debug_view_torn_down(self, dock_widget, node, widget):
+        # the fps menu and frame overlay belong to the view being dropped, the next build adds new ones
+        for action in dock_widget.actions():
+            dock_widget.removeAction(action)
+            action.deleteLater()
+        for overlay in [o for o in self.frame_overlays if o.view is widget.view]:
+            overlay.stop()
+            self.frame_overlays.remove(overlay)
+        ring = self.draw_rings.get(str(node))
+        if ring is not None:
+            ring.set_paused(True)
+
+    def _create_job(self):
+        reporters = {str(n): w.reporter for n, w in zip(self.nodes, self.draw_widgets)}
+        return create_job(self.pipeline_path, should_time=True, draw_rings=self.draw_rings, reporters=reporters, node_stats=self.node_stats, connection_stats=self.connection_stats, recording=self.recording, replay=self.replay, profile=self.profile)
+
+    def _start_live(self):
+        self.replay = None
+        self._start_pipeline()
+
+    def _start_replay(self):
+        path = QFileDialog.getExistingDirectory(self, 'Replay recording', self.pipeline_recordings_path)
+        if not path:
+            return
+        self.replay = {'path': path, 'speed': self.replay_speed.currentData()}
+        self.logger.info(f"Replaying {path} at {self.replay_speed.currentText()}")
+        self._start_pipeline()
+
     def _start_pipeline(self):
         self.stop_btn.setDisabled(False)
         self.start_btn.setDisabled(True)
+        self.replay_btn.setDisabled(True)
+        self.record_btn.setDisabled(False)
+        self.profile_btn.setDisabled(False)
         return super()._start_pipeline()
 
-    def _stop_pipeline(self):
+    def _start_profile(self):
+        path = self.profile.start(PROFILE_SECONDS)
+        self.profile_btn.setDisabled(True)
+        self.profile_btn.setText("Profiling…")
+        self.logger.info(f"Profiling for {PROFILE_SECONDS:.0f}s into {path}")
+        # the samplers write their results once the time is up, owned by the page so that it does not fire after the page is gone
+        self.profile_path = path
+        timer = QtCore.QTimer(self)
+        timer.setSingleShot(True)
+        timer.timeout.connect(self._finish_profile)
+        timer.timeout.connect(timer.deleteLater)
+        timer.start(int((PROFILE_SECONDS + 1) * 1000))
+
+    def _finish_profile(self):
+        path = self.profile_path
+        self.profile_btn.setText("Profile")
+        self.profile_btn.setDisabled(self.worker is None)
+        counts = merge(path)
+        if len(counts) == 0:
+            self.logger.warning(f"No samples in {path}, was the pipeline running?")
+            return
+        shares = '\n'.join(f'{share * 100:5.1f}% {node}' for node, share in node_shares(counts)[:10])
+        self.logger.info(f"Profile written to {path}:\n{shares}")
+        self._notify(QMessageBox.Information, 'Profile finished', f"Share of the samples taken in nodes:\n{shares}\n\nCollapsed stacks and speedscope json in {path}")
+
+    def _toggle_recording(self, checked):
+        if checked:
+            selected = [connection_key(item.connection) for item in self.edit_graph.scene.selectedItems() if isinstance(item, ConnectionGraphicsObject)]
+            keys = [k for k in selected if k in self.recording.index] or self.recording.keys
+            path = self.recording.start(keys)
+            self.logger.info(f"Recording {len(keys)} connections to {path}")
+        else:
+            self.recording.stop()
+            self.logger.info("Recording stopped")
+
+    def _stop_executor(self):
+        # hot restart: only the executor side graph is torn down, start builds a new one from the same job and it
+        # writes into the existing draw rings and reporters, so views and dock layout stay as they are
         self.stop_btn.setDisabled(True)
-        # self.start_btn.setDisabled(False)
+        self.record_btn.setChecked(False)
+        self.record_btn.setDisabled(True)
+        self.profile_btn.setDisabled(True)
+        super()._stop_executor()
+        self.start_btn.setDisabled(False)
+        self.replay_btn.setDisabled(False)
+
+    def _stop_pipeline(self):
         super()._stop_pipeline()
-        
-        # copy the current pipeline so we can actually re-run it
-        # self.pipeline = self.pipeline.copy()
-        # self.graph = Graph(start_node=self.pipeline)
+        self.report_channel.close()
+        self.heatmap.stop()
+        self.node_stats.close()
+        self.connection_stats.close()
+        self.recording.close()
+        self.profile.close()
+        # the draw rings are closed now, there is nothing left to restart against
+        self.start_btn.setDisabled(True)
+        self.replay_btn.setDisabled(True)
 
     def focus_node_view(self, node):
         name = node.get_name_resolve_macro() if hasattr(node, "get_name_resolve_macro") else node.name
@@ -125,4 +273,5 @@ class Debug(Run, Page):
     def save(self):
         with open(self.pipeline_gui_path, 'w') as f:
             f.write(self.dock_manager.save_state().data().decode())
+        self._save_fps_caps()
         self.edit_graph.save()
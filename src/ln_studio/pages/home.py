@@ -10,6 +10,7 @@ from qtpy.QtGui import QIcon
 from qtpy.QtWidgets import QInputDialog, QMessageBox, QToolButton, QComboBox, QComboBox, QPushButton, QVBoxLayout, QWidget, QGridLayout, QHBoxLayout, QScrollArea, QLabel, QFileDialog, QProgressBar
 from qtpy.QtCore import Qt, QSize, Signal, QTimer
 from ln_studio.utils.state import STATE
+from ln_studio.utils import pipeline_cache
 
 from livenodes import REGISTRY
 
@@ -203,6 +204,7 @@ class InstalledPackages(QWidget):
             self._timer.start()
         else:
             REGISTRY.reload(invalidate_caches=invalidate_caches)
+            pipeline_cache.registry_changed()
             self.progress_bar.setVisible(False)
 
     def _prefetch_reg_cb(self):
@@ -412,6 +414,9 @@ class Selection(QWidget):
             f"{base}_gui.json",
             f"{base}_gui_dock.xml",
             f"{base}_gui_dock_debug.xml",
+            f"{base}_gui_fps.json",
+            f"{base}_frame_stats.csv",
+            f"{base}_frame_stats_debug.csv",
         ]))
 
     def onnew(self):
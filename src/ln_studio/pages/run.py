@@ -1,42 +1,67 @@
 from functools import partial
 from livenodes import viewer
 import os
+import json
+import time
 import logging
 import threading as th
-from logging.handlers import QueueHandler, QueueListener
-from qtpy.QtWidgets import QHBoxLayout
+from qtpy.QtWidgets import QHBoxLayout, QMessageBox, QMenu, QAction, QActionGroup
 from qtpy import QtCore
+from qtpy.QtCore import Signal
 
 # from PyQtAds import QtAds
 from ln_studio.qtpydocking import (DockManager, DockWidget, DockWidgetArea)
 from ln_studio.qtpydocking.enums import DockWidgetFeature
 
-import multiprocessing as mp
 
-from livenodes import Node, Graph
+from livenodes import Node
 
+from ln_studio.executor import create_job, Executor, Control, STOP_TIMEOUT
 from ln_studio.components.node_views import node_view_mapper
 from ln_studio.components.page import Page, Action, ActionKind
+from ln_studio.components.frame_overlay import Frame_Stats_Overlay
+from ln_studio.utils.shm_ring import attach_ring_buffer
+from ln_studio.utils.stats import write_frame_stats_csv
+
+# frame rate caps offered in the context menu of each view's tab
+FPS_CAPS = [1, 5, 10, 15, 30, 60]
 
 # adapted from: https://stackoverflow.com/questions/39835300/python-qt-and-matplotlib-scatter-plots-with-blitting
 class Run(Page):
+    # emitted from the control pipe listener thread, qt queues them into the gui thread
+    pipeline_finished = Signal()
+    pipeline_crashed = Signal(str)
 
-    def __init__(self, pipeline_path, pipeline, parent=None):
+    def __init__(self, pipeline_path, pipeline, executor_pool=None, nodes=None, draw_rings=None, views=None, parent=None):
         super().__init__(parent=parent)
 
         if hasattr(pipeline, 'get_non_macro_node'):
             pipeline = pipeline.get_non_macro_node()
 
         self.pipeline = pipeline
-        self.graph = Graph(start_node=pipeline)
         self.pipeline_path = pipeline_path
         self.pipeline_gui_path = pipeline_path.replace('.yml', '_gui_dock.xml')
+        self.pipeline_fps_path = pipeline_path.replace('.yml', '_gui_fps.json')
+        self.fps_caps = self._load_fps_caps()
+        self.pipeline_frame_stats_path = pipeline_path.replace('.yml', '_frame_stats.csv')
+        self.frame_overlays = []
+        self.frame_stats = {}
         self.worker = None
+        self.executor_pool = executor_pool
         self.logger = logging.getLogger("LN-Studio")
 
         # === Setup draw canvases =================================================
-        self.nodes = [n for n in Node.discover_graph(pipeline) if isinstance(n, viewer.View)]
-        self.draw_widgets = list(map(partial(node_view_mapper, self), self.nodes))
+        # nodes may be discovered while loading already (see loading.Pipeline_Loader)
+        if nodes is None:
+            nodes = Node.discover_graph(pipeline)
+        self.nodes = [n for n in nodes if isinstance(n, viewer.View)]
+        if views is None:
+            self._attach_draw_rings(self.nodes)
+            views = {str(n): node_view_mapper(self, n) for n in self.nodes}
+        else:
+            # built ahead with their draw rings attached (see loading.View_Builder)
+            self.draw_rings = draw_rings
+        self.draw_widgets = [views[str(n)] for n in self.nodes]
         
         # QtAds.CDockManager.setConfigFlag(QtAds.CDockManager.XmlCompressionEnabled, False)
         
@@ -58,6 +83,7 @@ class Run(Page):
             self.widgets.append(dock_widget)
             dock_widget.view_toggled.connect(partial(debug_partial, self.logger, '=======', str(node), "qt emitted signal"))
             dock_widget.set_widget(widget)
+            self._add_view_actions(dock_widget, name, widget)
             # dock_widget.setFeature(QtAds.CDockWidget.DockWidgetClosable, False)
 
             # self.dock_manager.addDockWidget(QtAds.RightDockWidgetArea, dock_widget)
@@ -76,51 +102,153 @@ class Run(Page):
                 self.dock_manager.add_dock_widget(DockWidgetArea.right, widget)
 
 
+        self._suspend_hidden_views(zip(self.nodes, self.draw_widgets))
+
         # === Start pipeline =================================================
-        self.worker_term_lock = mp.Lock()
-        self.worker_stopped_lock = mp.Lock()
+        self._connect_control_signals()
         self._start_pipeline()
 
+    def _attach_draw_rings(self, nodes):
+        # the executor writes the draw state of each view into its own shared memory ring, which the views read in their draw timer
+        self.draw_rings = {str(n): attach_ring_buffer(n) for n in nodes if isinstance(n, viewer.View)}
+
+    def _load_fps_caps(self):
+        # {dock name: max fps} of the views whose cap was changed by the user
+        if not os.path.exists(self.pipeline_fps_path):
+            return {}
+        try:
+            with open(self.pipeline_fps_path, 'r') as f:
+                caps = json.load(f)
+        except (OSError, ValueError):
+            self.logger.exception(f'Could not load fps caps from {self.pipeline_fps_path}, using defaults')
+            return {}
+        if not isinstance(caps, dict):
+            self.logger.warning(f'Ignoring fps caps in {self.pipeline_fps_path}, expected a mapping of view name to fps')
+            return {}
+        # only the caps offered in the menu, anything else (eg edited by hand) falls back to the view's default
+        invalid = {name: fps for name, fps in caps.items() if fps not in FPS_CAPS or isinstance(fps, bool)}
+        if len(invalid) > 0:
+            self.logger.warning(f'Ignoring invalid fps caps in {self.pipeline_fps_path}: {invalid}, allowed are {FPS_CAPS}')
+        return {name: fps for name, fps in caps.items() if name not in invalid}
+
+    def _save_fps_caps(self):
+        with open(self.pipeline_fps_path, 'w') as f:
+            json.dump(self.fps_caps, f, indent=2)
+
+    def _add_view_actions(self, dock_widget, name, view):
+        # views without a draw loop have nothing to cap or measure
+        task = getattr(view, 'render_task', None)
+        if task is None:
+            return
+        self._add_fps_menu(dock_widget, name, task)
+        self._add_frame_overlay(dock_widget, name, view)
+
+    def _add_frame_overlay(self, dock_widget, name, view):
+        self.frame_stats[name] = view.render_task.stats
+        overlay = Frame_Stats_Overlay(view)
+        self.frame_overlays.append(overlay)
+        action = QAction('Show frame stats', dock_widget)
+        action.setCheckable(True)
+        action.toggled.connect(overlay.set_shown)
+        dock_widget.addAction(action)
+
+    def _write_frame_stats(self):
+        try:
+            write_frame_stats_csv(self.pipeline_frame_stats_path, self.frame_stats)
+            self.logger.info(f'Wrote frame stats to {self.pipeline_frame_stats_path}')
+        except OSError:
+            self.logger.exception('Could not write frame stats')
+
+    def _add_fps_menu(self, dock_widget, name, task):
+        if name in self.fps_caps:
+            task.set_interval(1000 / self.fps_caps[name])
+
+        menu = QMenu('Max FPS', dock_widget)
+        group = QActionGroup(menu)
+        for fps in [None] + FPS_CAPS:
+            action = menu.addAction(f'View default ({1 / task.default_interval:.0f})' if fps is None else str(fps))
+            action.setCheckable(True)
+            action.setChecked(self.fps_caps.get(name) == fps)
+            group.addAction(action)
+            action.triggered.connect(partial(self._set_fps_cap, name, task, fps))
+        dock_widget.addAction(menu.menuAction())
+
+    def _set_fps_cap(self, name, task, fps, checked=True):
+        self.logger.info(f'{name}: max fps set to {fps if fps is not None else "view default"}')
+        if fps is None:
+            self.fps_caps.pop(name, None)
+            task.set_interval(None)
+        else:
+            self.fps_caps[name] = fps
+            task.set_interval(1000 / fps)
+
+    def _suspend_hidden_views(self, views):
+        # the render scheduler stops drawing views that are not shown, additionally tell the executor to stop sending their draw state
+        for node, view in views:
+            task = getattr(view, 'render_task', None)
+            ring = self.draw_rings.get(str(node))
+            if task is not None and ring is not None:
+                task.on_visibility_changed = partial(self._on_view_visibility, str(node), ring)
+
+    def _on_view_visibility(self, name, ring, visible):
+        self.logger.debug(f'{name}: {"resuming" if visible else "suspending"} draw transport')
+        ring.set_paused(not visible)
+
+    def _close_draw_rings(self):
+        for name, ring in getattr(self, 'draw_rings', {}).items():
+            self.logger.info(f'Draw transport {name}: {ring.stats()}')
+            ring.close()
+        self.draw_rings = {}
+
+    def _connect_control_signals(self):
+        self.worker_listener = None
+        self.pipeline_finished.connect(self._on_pipeline_finished)
+        self.pipeline_crashed.connect(self._on_pipeline_crashed)
+
     def _start_pipeline(self):
         if self.worker is None:
-            self.worker_term_lock.acquire()
-
-            parent_log_queue = mp.Queue()
-            logger_name = 'LN-Studio'
-            
-            # self.worker_log_handler_termi_sig = th.Event()
-
-            # self.worker_log_handler = th.Thread(target=drain_log_queue, args=(parent_log_queue, logger_name, self.worker_log_handler_termi_sig))
-            # self.worker_log_handler.deamon = True
-            # self.worker_log_handler.name = f"LogDrain-{self.worker_log_handler.name.split('-')[-1]}"
-            # self.worker_log_handler.start()
-            self.queue_listener = QueueListener(parent_log_queue)
-            self.queue_listener.start()
-
-            self.worker = mp.Process(target=self.worker_start, args=(parent_log_queue, logger_name,), name="LN-Executor")
-            # self.worker.daemon = True # not possible since the node graph might create it's own threads and processes
-            self.worker.start()
-
-    def worker_start(self, subprocess_log_queue, logger_name):
-        logger = logging.getLogger(logger_name)
-        logger.addHandler(QueueHandler(subprocess_log_queue))
-        logger.propagate = False
-
-        logger.info(f"Starting Worker")
-        self.worker_stopped_lock.acquire()
-
-        self.graph.start_all()
-        while not self.worker_term_lock.acquire(timeout=1, block=True):
-            if self.graph.is_finished():
-                logger.info(f"Worker finished. Waiting for user to return to home screen.")
-                # TODO: pop up in qt/gui process?
-
-        self.worker_term_lock.release()
-        logger.info(f"Stopping Worker")
-        # timeout to make sure potential non-returning nodes do not block until eternity
-        self.graph.stop_all()
-        self.worker_stopped_lock.release()
-        logger.info(f"Worker Stopped")
+            # the executor only receives picklable handles, never this widget, so that it runs with any start method
+            job = self._create_job()
+            if self.executor_pool is not None:
+                self.worker = self.executor_pool.acquire(job)
+            else:
+                self.worker = Executor(job)
+
+            self.worker_listener = th.Thread(target=self._listen_worker, args=(self.worker, ), name="LN-Control", daemon=True)
+            self.worker_listener.start()
+
+    def _listen_worker(self, executor):
+        # sole reader of the control pipe, returns once the executor exits
+        while True:
+            try:
+                msg, payload = executor.conn.recv()
+            except (EOFError, OSError):
+                break
+            if msg == Control.STARTED:
+                self.logger.info(f'Pipeline started {time.time() - executor.started_at:.2f}s after launch')
+            elif msg == Control.FINISHED:
+                self.pipeline_finished.emit()
+            elif msg == Control.CRASHED:
+                self.pipeline_crashed.emit(payload)
+            elif msg == Control.STOPPED:
+                break
+
+    def _notify(self, icon, title, text):
+        # non-modal, the views keep drawing while the message is shown
+        box = QMessageBox(icon, title, text, QMessageBox.Ok, self)
+        box.setModal(False)
+        box.show()
+
+    def _on_pipeline_finished(self):
+        self.logger.info('Pipeline finished')
+        self._notify(QMessageBox.Information, 'Pipeline finished', 'All nodes finished. Return to the home screen to run it again.')
+
+    def _on_pipeline_crashed(self, trace):
+        self.logger.error(f'Pipeline crashed:\n{trace}')
+        self._notify(QMessageBox.Critical, 'Pipeline crashed', trace.strip().split('\n')[-1])
+
+    def _create_job(self):
+        return create_job(self.pipeline_path, draw_rings=self.draw_rings)
 
     def stop(self, *args, **kwargs):
         self.logger.info('Stopping pipeline')
@@ -129,31 +257,34 @@ class Run(Page):
     # i would have assumed __del__ would be the better fit, but that doesn't seem to be called when using del... for some reason
     # will be called in parent view, but also called on exiting the canvas
     def _stop_pipeline(self):
+        self._stop_executor()
+
         self.logger.info(f"Stopping Widgets")
+        self._write_frame_stats()
+        for overlay in self.frame_overlays:
+            overlay.stop()
+        for widget in self.draw_widgets:
+            widget.stop()
+
+        self._close_draw_rings()
+
+    def _stop_executor(self):
+        # the views, draw rings and reporters outlive the executor, so that a new one can be started against them
         if self.worker is not None:
             # Tell the process to terminate, then wait until it returns
-            self.worker_term_lock.release()
-            
             self.logger.info(f"Stopping Worker")
-            # Block until graph finished all it's nodes
-            self.worker_stopped_lock.acquire()
-            self.worker_stopped_lock.release()
-            self.logger.info('View terminated')
-
-            self.logger.info('Terminating draw widgets')
-            self.logger.info(f"Killing Worker")
-            self.worker.terminate()
+            self.worker.stop(STOP_TIMEOUT)
+            self.logger.info('Worker terminated')
 
-            # self.worker_log_handler_termi_sig.set()
+            self.worker_listener.join()
+            self.worker.close()
+            self.worker_listener = None
             self.worker = None
 
-        for widget in self.draw_widgets:
-            widget.stop()
+            # start the replacement now, while the user is busy elsewhere
+            if self.executor_pool is not None:
+                self.executor_pool.fill()
 
-        if hasattr(self, "queue_listener") and self.queue_listener is not None:
-            self.queue_listener.stop()
-            self.queue_listener = None
-           
 
     def get_actions(self):
         return [ \
@@ -164,3 +295,4 @@ class Run(Page):
     def save(self):
         with open(self.pipeline_gui_path, 'w') as f:
             f.write(self.dock_manager.save_state().data().decode())
+        self._save_fps_caps()
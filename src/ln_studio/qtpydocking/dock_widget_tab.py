@@ -334,6 +334,11 @@ class DockWidgetTab(QFrame):
         detach = menu.addAction("Detach", self.on_detach_action_triggered)
         detach.setEnabled(self.d.floatable)
 
+        # actions added to the dock widget by the application (QWidget.addAction)
+        if self.d.dock_widget.actions():
+            menu.addSeparator()
+            menu.addActions(self.d.dock_widget.actions())
+
         menu.addSeparator()
 
         action = menu.addAction("Close", self.close_requested)
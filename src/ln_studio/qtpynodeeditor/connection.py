@@ -67,6 +67,8 @@ class Connection(QObject, Serializable):
         self._style = style
         self._connection_geometry = ConnectionGeometry(style)
         self._graphics_object = None
+        # optional (label, QColor, line width) drawn on top of the connection, eg its traffic while debugging
+        self.runtime_stats = None
 
     def _cleanup(self):
         if self.is_complete:
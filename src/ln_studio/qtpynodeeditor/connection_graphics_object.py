@@ -7,7 +7,7 @@ from qtpy.QtWidgets import (QGraphicsBlurEffect, QGraphicsItem,
                             QGraphicsSceneMouseEvent, QStyleOptionGraphicsItem,
                             QWidget)
 
-from .connection_painter import ConnectionPainter
+from .connection_painter import RUNTIME_LABEL_MARGIN, ConnectionPainter
 from .node_connection_interaction import NodeConnectionInteraction
 from .port import PortType, opposite_port
 from qtpy.QtCore import Qt
@@ -68,7 +68,11 @@ class ConnectionGraphicsObject(QGraphicsObject):
         -------
         value : QRectF
         """
-        return self._geometry.bounding_rect
+        rect = self._geometry.bounding_rect
+        if self._connection.runtime_stats is not None:
+            # the label is centered on the curve, make room for it
+            rect = rect.adjusted(-RUNTIME_LABEL_MARGIN * 4, -RUNTIME_LABEL_MARGIN, RUNTIME_LABEL_MARGIN * 4, RUNTIME_LABEL_MARGIN)
+        return rect
 
     def shape(self) -> QPainterPath:
         """
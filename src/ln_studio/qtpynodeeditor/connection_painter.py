@@ -1,7 +1,7 @@
 import typing
 
-from qtpy.QtCore import QLineF, QPointF, QSize, Qt
-from qtpy.QtGui import QIcon, QPainter, QPainterPath, QPainterPathStroker, QPen
+from qtpy.QtCore import QLineF, QPointF, QRectF, QSize, Qt
+from qtpy.QtGui import QColor, QIcon, QPainter, QPainterPath, QPainterPathStroker, QPen
 
 from .connection_geometry import ConnectionGeometry
 from .enums import PortType
@@ -12,6 +12,8 @@ if typing.TYPE_CHECKING:
 
 
 use_debug_drawing = False
+# room around a connection for its runtime stats label
+RUNTIME_LABEL_MARGIN = 24
 
 
 def cubic_path(geom):
@@ -165,6 +167,27 @@ def draw_normal_line(painter, connection, style):
         painter.drawPath(cubic)
 
 
+def draw_runtime_stats(painter, connection):
+    if connection.requires_port or connection.runtime_stats is None:
+        return
+    label, color, width = connection.runtime_stats
+
+    cubic = cubic_path(connection.geometry)
+    painter.setPen(QPen(color, width))
+    painter.setBrush(Qt.NoBrush)
+    painter.drawPath(cubic)
+
+    if label:
+        metrics = painter.fontMetrics()
+        rect = metrics.boundingRect(label).adjusted(-3, -1, 3, 1)
+        rect.moveCenter(cubic.pointAtPercent(0.5).toPoint())
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(0, 0, 0, 170))
+        painter.drawRoundedRect(QRectF(rect), 3, 3)
+        painter.setPen(QColor('white'))
+        painter.drawText(rect, Qt.AlignCenter, label)
+
+
 class ConnectionPainter:
     @staticmethod
     def paint(painter: QPainter, connection: 'Connection',
@@ -181,6 +204,7 @@ class ConnectionPainter:
         draw_hovered_or_selected(painter, connection, style)
         draw_sketch_line(painter, connection, style)
         draw_normal_line(painter, connection, style)
+        draw_runtime_stats(painter, connection)
         if use_debug_drawing:
             debug_drawing(painter, connection)
 
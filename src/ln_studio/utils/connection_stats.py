@@ -0,0 +1,156 @@
+import sys
+import time
+
+import numpy as np
+
+from ln_studio.utils.shm_block import SHM_Block
+from ln_studio.utils.node_hooks import Emit_Hook
+
+# counters per connection (float64): messages received, bytes emitted, summed emit to receive latency (seconds), messages the latency was measured for
+MSGS, BYTES, LATENCY, MEASURED = range(4)
+_FIELDS = 4
+# emit times are kept for the last EMIT_SLOTS clock values of a connection, items received later than that are not measured
+EMIT_SLOTS = 64
+
+
+def nbytes(data):
+    """
+    Cheap estimate of the payload size of an emitted value, exact for arrays and bytes.
+    """
+    if isinstance(data, np.ndarray):
+        return data.nbytes
+    if isinstance(data, (bytes, bytearray, str)):
+        return len(data)
+    if isinstance(data, (list, tuple)):
+        if len(data) == 0:
+            return 0
+        # long lists are extrapolated from their first items
+        head = data[:16]
+        return sum(nbytes(x) for x in head) * len(data) // len(head)
+    if isinstance(data, dict):
+        return sum(nbytes(x) for x in data.values())
+    return sys.getsizeof(data)
+
+
+class Connection_Stats_Table(SHM_Block):
+    """
+    Traffic counters of all connections of a pipeline in one shared memory block, keyed by Connection.serialize_compact().
+
+    The emitting node adds messages / bytes and stores the emit time per clock value, the receiving node looks the emit time up once the value arrived and adds the latency.
+    Like Node_Stats_Table all values are cumulative and only the gui derives rates from two samples, so the executor never sends anything.
+    """
+
+    _views = ('table', 'emitted')
+
+    def __init__(self, keys, name=None):
+        self.keys = list(keys)
+        self.index = {k: i for i, k in enumerate(self.keys)}
+
+        rows = max(len(self.keys), 1)
+        super().__init__(rows * (_FIELDS + 2 * EMIT_SLOTS) * 8, name=name)
+        data = np.ndarray((rows, _FIELDS + 2 * EMIT_SLOTS), dtype=np.float64, buffer=self._shm.buf)
+        self.table = data[:, :_FIELDS]
+        # (clock, emit time) per slot, slot = clock % EMIT_SLOTS
+        self.emitted = data[:, _FIELDS:].reshape(rows, EMIT_SLOTS, 2)
+        if self.owner:
+            data[:] = 0
+            self.emitted[:, :, 0] = -1
+
+    def _args(self):
+        return (self.keys,)
+
+    def sample(self):
+        return time.time(), self.table[:len(self.keys)].copy()
+
+
+def connection_key(con):
+    """
+    Key of a livenodes connection in a Connection_Stats_Table.
+    A connection from a Replay_Source is keyed like the recorded connection it stands in for, so that a replay is annotated on the original connections.
+    """
+    key = con.serialize_compact()
+    replaces = getattr(con._emit_node, 'replaces', None)
+    if replaces is not None:
+        key = replaces + key[len(str(con._emit_node)):]
+    return key
+
+
+class Connection_Stats_Writer():
+    """
+    Reporter counting the traffic on a node's connections into a Connection_Stats_Table.
+
+    attach() wraps the node's _emit_data (on top of any other wrapper) to count outgoing values, received values are counted from the node's current_state reports.
+    """
+
+    def __init__(self, table, node_name, outputs, inputs):
+        """
+        outputs: emit port key -> connection keys leaving it
+        inputs: recv port key -> connection key arriving at it
+        """
+        self.table = table
+        self.node_name = node_name
+        self.outputs = outputs
+        self.inputs = inputs
+        # last clock value counted per input, a value is reported again for every input that arrives at the same clock
+        self.counted = {}
+
+    @classmethod
+    def for_node(cls, table, node):
+        outputs, inputs = {}, {}
+        for con in node.output_connections:
+            if connection_key(con) in table.index:
+                outputs.setdefault(con._emit_port.key, []).append(table.index[connection_key(con)])
+        for con in node.input_connections:
+            if connection_key(con) in table.index:
+                inputs[con._recv_port.key] = table.index[connection_key(con)]
+        return cls(table, str(node), outputs, inputs)
+
+    def __getstate__(self):
+        return {'table': self.table, 'node_name': self.node_name, 'outputs': self.outputs, 'inputs': self.inputs}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def attach(self, node):
+        if len(self.outputs) > 0:
+            node._emit_data = Emit_Hook(self, node, node._emit_data)
+
+    def emitted(self, channel, clock, data):
+        rows = self.outputs.get(channel)
+        if rows is None:
+            return
+        size = nbytes(data)
+        now = time.time()
+        for row in rows:
+            self.table.table[row, MSGS] += 1
+            self.table.table[row, BYTES] += size
+            if clock is not None:
+                self.table.emitted[row, int(clock) % EMIT_SLOTS] = (clock, now)
+
+    def __call__(self, **kwargs):
+        if 'current_state' not in kwargs or len(self.inputs) == 0:
+            return
+        state = kwargs['current_state']
+        clock = state['ctr']
+        now = time.time()
+        for key in state['data']:
+            row = self.inputs.get(key)
+            if row is None or self.counted.get(key) == clock:
+                continue
+            self.counted[key] = clock
+            emit_clock, emit_time = self.table.emitted[row, int(clock) % EMIT_SLOTS]
+            if emit_clock == clock:
+                self.table.table[row, LATENCY] += now - emit_time
+                self.table.table[row, MEASURED] += 1
+
+
+def connection_rates(previous, current):
+    """
+    Per connection rates between two samples of a Connection_Stats_Table, as arrays over the connections:
+    messages per second, bytes per second and mean emit to receive latency in seconds (nan if none was measured).
+    """
+    (t0, a), (t1, b) = previous, current
+    dt = max(t1 - t0, 1e-6)
+    measured = b[:, MEASURED] - a[:, MEASURED]
+    latency = np.divide(b[:, LATENCY] - a[:, LATENCY], measured, out=np.full(len(b), np.nan), where=measured > 0)
+    return (b[:, MSGS] - a[:, MSGS]) / dt, (b[:, BYTES] - a[:, BYTES]) / dt, latency
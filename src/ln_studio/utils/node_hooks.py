@@ -0,0 +1,42 @@
+"""
+Wrappers the executor side installs on a node's methods (eg stop, _emit_data) to hook reporters, recorders etc into the node.
+
+They are callable classes instead of closures, so that a node stays picklable once wrapped (nodes are sent to the process they compute in).
+Each wrapper calls the method it replaced, so several can be stacked onto the same node.
+"""
+
+
+class Flush_On_Stop():
+    """
+    stop of a node that flushes `target` (anything with a flush method) before the node stops, eg to write out pending reports or recordings.
+    """
+
+    def __init__(self, target, node, stop):
+        self.target = target
+        self.node = node
+        self.stop = stop
+
+    def __call__(self):
+        self.target.flush()
+        return self.stop()
+
+
+class Emit_Hook():
+    """
+    _emit_data of a node that hands every value to `target.emitted(port key, clock, data)` before emitting it with the previous _emit_data.
+    """
+
+    def __init__(self, target, node, emit):
+        self.target = target
+        self.node = node
+        self.emit = emit
+
+    def __call__(self, data, channel=None, ctr=None):
+        key = channel
+        if key is None:
+            # livenodes emits on the first output port if none is given
+            key = list(self.node.ports_out._asdict().values())[0].key
+        elif not isinstance(key, str):
+            key = key.key
+        self.target.emitted(key, self.node._ctr if ctr is None else ctr, data)
+        return self.emit(data, channel=channel, ctr=ctr)
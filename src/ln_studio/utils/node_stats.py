@@ -0,0 +1,109 @@
+import time
+
+import numpy as np
+
+from ln_studio.utils.shm_block import SHM_Block
+
+# counters per node (float64): process calls, seconds spent in process, items waiting in the input queues, time of the last update
+CALLS, BUSY, BACKLOG, UPDATED = range(4)
+_FIELDS = 4
+
+
+def input_backlog(node):
+    """
+    Number of items waiting in the node's input bridges (received but not yet processed), -1 if the bridges cannot tell.
+    """
+    storage = getattr(node, 'data_storage', None)
+    if storage is None:
+        return 0
+    ctr = getattr(node, '_ctr', None)
+    total = 0
+    for bridge in storage.in_bridges.values():
+        # the item currently processed is only discarded after the report
+        total += sum(1 for key in getattr(bridge, '_read', {}) if ctr is None or key > ctr)
+        queue = getattr(bridge, 'queue', None)
+        if queue is not None:
+            try:
+                total += queue.qsize()
+            except (NotImplementedError, AttributeError):
+                # mp.Queue.qsize is not implemented on macos
+                return -1
+    return total
+
+
+class Node_Stats_Table(SHM_Block):
+    """
+    Cumulative timing counters of all nodes of a pipeline in one shared memory block, one row per node.
+
+    The executor side only ever adds to its node's row, the gui samples the whole table a few times per second and derives rates from the difference of two samples.
+    Rows are not guarded by a seqlock: a torn read only mixes the counters of two consecutive calls, which does not matter for rates.
+    """
+
+    _views = ('table',)
+
+    def __init__(self, names, name=None):
+        self.names = list(names)
+        self.index = {n: i for i, n in enumerate(self.names)}
+
+        rows = max(len(self.names), 1)
+        super().__init__(rows * _FIELDS * 8, name=name)
+        self.table = np.ndarray((rows, _FIELDS), dtype=np.float64, buffer=self._shm.buf)
+        if self.owner:
+            self.table[:] = 0
+
+    def _args(self):
+        return (self.names,)
+
+    def row(self, node_name):
+        return self.table[self.index[node_name]]
+
+    def sample(self):
+        return time.time(), self.table[:len(self.names)].copy()
+
+
+class Node_Stats_Writer():
+    """
+    Reporter adding one node's process calls to its row of a Node_Stats_Table. Process times need the node to be created with should_time.
+    """
+
+    def __init__(self, table, node_name):
+        self.table = table
+        self.node_name = node_name
+        self._row = None
+
+    def __getstate__(self):
+        return {'table': self.table, 'node_name': self.node_name}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __call__(self, **kwargs):
+        # nodes report themselves after every process call and producers after every message,
+        # except blocking producers, which report without any arguments
+        if 'node' not in kwargs and len(kwargs) > 0:
+            return
+        node = kwargs.get('node')
+        if self._row is None:
+            self._row = self.table.row(self.node_name)
+        row = self._row
+        row[CALLS] += 1
+        if node is not None:
+            # empty for producers, they do not process
+            calls = node._perf_user_fn.calls
+            if len(calls) > 0:
+                row[BUSY] += calls[-1]
+            row[BACKLOG] = input_backlog(node)
+        row[UPDATED] = time.time()
+
+
+def node_rates(previous, current):
+    """
+    Per node rates between two samples of a Node_Stats_Table, as arrays over the nodes:
+    calls per second, mean seconds per call, share of the wall time spent in process (1 = one fully busy core) and the current backlog.
+    """
+    (t0, a), (t1, b) = previous, current
+    dt = max(t1 - t0, 1e-6)
+    calls = b[:, CALLS] - a[:, CALLS]
+    busy = b[:, BUSY] - a[:, BUSY]
+    per_call = np.divide(busy, calls, out=np.zeros_like(busy), where=calls > 0)
+    return calls / dt, per_call, busy / dt, b[:, BACKLOG]
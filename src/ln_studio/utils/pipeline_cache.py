@@ -0,0 +1,76 @@
+import os
+import copy
+import threading as th
+from collections import OrderedDict
+
+import yaml
+from livenodes import Node
+
+import logging
+logger = logging.getLogger('LN-Studio')
+
+# number of parsed pipeline files kept in memory
+CACHE_SIZE = int(os.getenv('LNS_PIPELINE_CACHE_SIZE', 32))
+
+_cache = OrderedDict()
+_lock = th.Lock()
+_registry_version = 0
+
+
+def registry_changed():
+    """
+    Call after the node registry was reloaded, drops everything parsed against the old node classes.
+    """
+    global _registry_version
+    with _lock:
+        _registry_version += 1
+        _cache.clear()
+
+
+def clear():
+    with _lock:
+        _cache.clear()
+
+
+def load_compact_yml(path):
+    """
+    Parsed content of a pipeline yml (compact format: {'Nodes': ..., 'Inputs': ...}), None if the file is empty.
+
+    Parsing is cached per path, modification time, size and registry version (LRU, CACHE_SIZE entries).
+    Every call returns its own copy, as node constructors may keep and modify their settings.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size, _registry_version)
+
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return copy.deepcopy(_cache[key])
+
+    # parse outside the lock, the loader thread and the gui may load different pipelines at the same time
+    if stat.st_size == 0:
+        # the pipeline was just created and no nodes were added yet
+        parsed = None
+    else:
+        with open(path, 'r') as f:
+            parsed = yaml.load(f, Loader=yaml.Loader)
+
+    with _lock:
+        # older versions of the same file cannot be hit anymore
+        for old in [k for k in _cache if k[0] == path]:
+            del _cache[old]
+        _cache[key] = parsed
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return copy.deepcopy(parsed)
+
+
+def load_pipeline(path, **kwargs):
+    """
+    Drop-in for Node.load on yml pipelines, using the parse cache. kwargs are passed to Node.from_compact_dict.
+    """
+    if not path.endswith('.yml'):
+        return Node.load(path, **kwargs)
+    logger.debug(f'Loading pipeline from {path}')
+    return Node.from_compact_dict(load_compact_yml(path), **kwargs)
@@ -0,0 +1,258 @@
+"""
+Sampling profiler for the processes a pipeline runs in.
+
+The gui requests a profile through a shared Profile_Control. Every process running nodes notices the request on the next report of one of
+its nodes, or at the latest on the next poll of its watcher thread (a node stuck in one long call does not report), and starts a sampler
+thread, which periodically looks at the stacks of all other threads (sys._current_frames) and counts them.
+Samples are attributed to the node whose _process (or producer loop) is on the stack. Each process writes its counts as collapsed stacks
+into the profile's directory, merge() combines them and exports collapsed stacks and speedscope json.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import threading as th
+from collections import Counter
+
+import numpy as np
+
+from ln_studio.utils.shm_block import SHM_Block
+
+import logging
+logger = logging.getLogger('LN-Studio')
+
+# seconds between two samples
+PROFILE_INTERVAL = float(os.getenv('LNS_PROFILE_INTERVAL_MS', 5)) / 1000
+# seconds between two looks of a process' watcher thread at the profile requests
+PROFILE_POLL = float(os.getenv('LNS_PROFILE_POLL_S', 0.2))
+# frames of the node system that have the node as `self`, only these are inspected to attribute a sample
+NODE_FRAMES = {'_process', '_async_onstart', '_onstart', '_blocking_onstart'}
+
+_REQUEST, _UNTIL, _INTERVAL = range(3)
+
+# requests a sampler was started for in this process, several nodes share a process
+_started = set()
+# shared memory names of the controls a watcher thread runs for in this process
+_watched = set()
+_started_lock = th.Lock()
+
+
+def profile_path(base, request):
+    return os.path.join(base, f'profile_{request:03d}')
+
+
+class Profile_Control(SHM_Block):
+    """
+    Shared between gui and executor: number of the latest profile request, until when to sample and the sampling interval.
+    """
+
+    _views = ('values',)
+
+    def __init__(self, base_path, name=None):
+        self.base_path = base_path
+        super().__init__(3 * 8, name=name)
+        self.values = np.ndarray((3,), dtype=np.float64, buffer=self._shm.buf)
+        if self.owner:
+            self.values[:] = 0
+
+    def _args(self):
+        return (self.base_path,)
+
+    @property
+    def request(self):
+        return int(self.values[_REQUEST])
+
+    def start(self, seconds, interval=PROFILE_INTERVAL):
+        """
+        Requests a profile of the next `seconds`, returns the directory the processes write into.
+        """
+        existing = [int(p.rsplit('_', 1)[-1]) for p in glob.glob(os.path.join(self.base_path, 'profile_*')) if p.rsplit('_', 1)[-1].isdigit()]
+        request = max(existing + [self.request], default=0) + 1
+        path = profile_path(self.base_path, request)
+        os.makedirs(path, exist_ok=True)
+        self.values[_UNTIL] = time.time() + seconds
+        self.values[_INTERVAL] = interval
+        # last, so that samplers only start once the rest is set
+        self.values[_REQUEST] = request
+        return path
+
+
+class Profiler_Hook():
+    """
+    Reporter registered on every node: starts a sampler in the node's process once a new profile was requested.
+
+    Once in the node's process (unpickled there or attached) it also starts the process' watcher thread, which looks for requests
+    independent of the nodes' reports.
+    """
+
+    def __init__(self, control):
+        self.control = control
+        self.seen = 0
+
+    def __getstate__(self):
+        return {'control': self.control}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+        self.watch()
+
+    def attach(self, node):
+        self.watch()
+
+    def watch(self):
+        with _started_lock:
+            if self.control.name in _watched:
+                return
+            _watched.add(self.control.name)
+        th.Thread(target=_watch, args=(Profiler_Hook(self.control),), name="LN-Profiler-Watch", daemon=True).start()
+
+    def __call__(self, **kwargs):
+        self.poll()
+
+    def poll(self):
+        request = self.control.request
+        if request == self.seen:
+            return
+        self.seen = request
+        values = self.control.values
+        if time.time() >= values[_UNTIL]:
+            # requested before the pipeline (re)started and already over
+            return
+        with _started_lock:
+            if request in _started:
+                return
+            _started.add(request)
+        sampler = Sampler(profile_path(self.control.base_path, request), until=values[_UNTIL], interval=values[_INTERVAL])
+        th.Thread(target=sampler.run, name="LN-Profiler", daemon=True).start()
+
+
+def _watch(hook):
+    # runs until the process exits or the control is closed in it
+    while hook.control.values is not None:
+        hook.poll()
+        time.sleep(PROFILE_POLL)
+
+
+def _frame_name(code):
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def collapse(frame, thread_name):
+    """
+    Collapsed stack of a thread ('root;outer;...;inner'), rooted at the node the stack belongs to if there is one.
+    """
+    names = []
+    root = thread_name
+    while frame is not None:
+        code = frame.f_code
+        names.append(_frame_name(code))
+        if code.co_name in NODE_FRAMES:
+            node = frame.f_locals.get('self')
+            if node is not None and hasattr(node, 'compute_on'):
+                # frames above the node's entry are the node system's scheduling, not interesting for the node
+                root = f'[node] {node}'
+                break
+        frame = frame.f_back
+    names.append(root)
+    return ';'.join(reversed(names))
+
+
+class Sampler():
+    """
+    Samples the stacks of all threads of this process except its own until `until`, then writes them as collapsed stacks to <path>/<pid>.txt.
+    """
+
+    def __init__(self, path, until, interval=PROFILE_INTERVAL):
+        self.path = path
+        self.until = until
+        self.interval = interval
+        self.counts = Counter()
+
+    def sample(self):
+        own = th.get_ident()
+        names = {t.ident: t.name for t in th.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident != own:
+                self.counts[collapse(frame, names.get(ident, str(ident)))] += 1
+
+    def run(self):
+        while time.time() < self.until:
+            t = time.perf_counter()
+            self.sample()
+            time.sleep(max(self.interval - (time.perf_counter() - t), 0))
+        self.write()
+
+    def write(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, f'{os.getpid()}.txt'), 'w') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+# === Export (gui side) =================
+def read_collapsed(path):
+    counts = Counter()
+    with open(path, 'r') as f:
+        for line in f:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack:
+                counts[stack] += int(count)
+    return counts
+
+
+def merge(path):
+    """
+    Combines the per process samples of a profile, writes profile.collapsed.txt and profile.speedscope.json next to them
+    and returns the merged counts. Processes are prefixed so that their threads stay apart.
+    """
+    counts = Counter()
+    for file in sorted(glob.glob(os.path.join(path, '*.txt'))):
+        pid = os.path.basename(file)[:-len('.txt')]
+        if not pid.isdigit():
+            continue
+        for stack, count in read_collapsed(file).items():
+            counts[f'pid {pid};{stack}'] += count
+
+    with open(os.path.join(path, 'profile.collapsed.txt'), 'w') as f:
+        for stack, count in counts.most_common():
+            f.write(f'{stack} {count}\n')
+    with open(os.path.join(path, 'profile.speedscope.json'), 'w') as f:
+        json.dump(to_speedscope(counts, name=os.path.basename(path)), f)
+    return counts
+
+
+def to_speedscope(counts, name='profile'):
+    """
+    Speedscope sampled profile (https://www.speedscope.app/file-format-schema.json) from collapsed stack counts.
+    """
+    frames, index, samples, weights = [], {}, [], []
+    for stack, count in counts.items():
+        sample = []
+        for frame in stack.split(';'):
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({'name': frame})
+            sample.append(index[frame])
+        samples.append(sample)
+        weights.append(count)
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'ln-studio',
+        'shared': {'frames': frames},
+        'profiles': [{'type': 'sampled', 'name': name, 'unit': 'none', 'startValue': 0, 'endValue': sum(weights), 'samples': samples, 'weights': weights}],
+    }
+
+
+def node_shares(counts):
+    """
+    Share per node of the samples taken inside of nodes, largest first. Idle threads and the node system's scheduling do not count.
+    """
+    per_node = Counter()
+    for stack, count in counts.items():
+        node = next((frame[len('[node] '):] for frame in stack.split(';') if frame.startswith('[node] ')), None)
+        if node is not None:
+            per_node[node] += count
+    total = sum(per_node.values())
+    return [(node, count / total) for node, count in per_node.most_common()]
@@ -0,0 +1,348 @@
+"""
+Recording and replay of the values sent over a pipeline's connections.
+
+A recording session is a directory with a manifest and one sub directory per recorded connection:
+
+    session_003/
+        recording.json          connection key -> sub directory, start time
+        con_000/
+            index.bin           one INDEX_DTYPE record per message (emit time, clock, chunk, row in chunk)
+            chunk_000000.npy    equally shaped arrays stacked, np.load(mmap_mode='r') reads single messages without loading the chunk
+            chunk_000001.pkl    pickled list of anything else
+
+Chunks are append-only: a chunk file is written once (renamed into place when complete) and its index records are appended after,
+so that a reader never sees index records of a chunk that is not on disk yet.
+"""
+import os
+import json
+import glob
+import time
+import pickle
+import asyncio
+
+import numpy as np
+
+from livenodes.producer_async import Producer_async
+from livenodes.components.port import Ports_collection
+
+from ln_studio.utils.shm_block import SHM_Block
+from ln_studio.utils.node_hooks import Emit_Hook, Flush_On_Stop
+
+import logging
+logger = logging.getLogger('LN-Studio')
+
+INDEX_DTYPE = np.dtype([('time', np.float64), ('ctr', np.int64), ('chunk', np.int64), ('row', np.int64)])
+# messages per chunk and max seconds a message is kept in memory before its chunk is written
+CHUNK_MESSAGES = int(os.getenv('LNS_RECORD_CHUNK_MESSAGES', 1024))
+CHUNK_SECONDS = 0.5
+MANIFEST = 'recording.json'
+
+
+def session_path(base, session):
+    return os.path.join(base, f'session_{session:03d}')
+
+
+def next_session(base):
+    """
+    Number of the next session in the recordings directory, sessions of earlier runs are kept.
+    """
+    existing = [int(os.path.basename(p).split('_')[-1]) for p in glob.glob(os.path.join(base, 'session_*')) if os.path.basename(p).split('_')[-1].isdigit()]
+    return max(existing, default=0) + 1
+
+
+def write_manifest(path, keys):
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, MANIFEST), 'w') as f:
+        json.dump({'started': time.time(), 'connections': keys}, f, indent=2)
+
+
+def read_manifest(path):
+    """
+    Connection key -> directory of its recording, for all connections of the session.
+    """
+    with open(os.path.join(path, MANIFEST), 'r') as f:
+        keys = json.load(f)['connections']
+    return {key: os.path.join(path, folder) for key, folder in keys.items()}
+
+
+# === Chunks =================
+class Chunk_Writer():
+    """
+    Appends the messages of one connection to its recording directory.
+    """
+
+    def __init__(self, path, chunk_messages=CHUNK_MESSAGES, chunk_seconds=CHUNK_SECONDS):
+        self.path = path
+        self.chunk_messages = chunk_messages
+        self.chunk_seconds = chunk_seconds
+        os.makedirs(path, exist_ok=True)
+        self.chunk = len(glob.glob(os.path.join(path, 'chunk_*')))
+        self.values = []
+        self.index = []
+
+    def _stackable(self, value):
+        if not isinstance(value, np.ndarray) or value.dtype == object:
+            return False
+        if len(self.values) == 0:
+            return True
+        first = self.values[0]
+        return isinstance(first, np.ndarray) and first.shape == value.shape and first.dtype == value.dtype
+
+    def append(self, ctr, value, t=None):
+        t = time.time() if t is None else t
+        if len(self.values) > 0 and self._stackable(value) != self._stackable(self.values[0]):
+            # arrays after other values or a shape change: start a new chunk
+            self.flush()
+        self.values.append(value)
+        self.index.append((t, -1 if ctr is None else ctr, self.chunk, len(self.values) - 1))
+        if len(self.values) >= self.chunk_messages or t - self.index[0][0] >= self.chunk_seconds:
+            self.flush()
+
+    def flush(self):
+        if len(self.values) == 0:
+            return
+        name = os.path.join(self.path, f'chunk_{self.chunk:06d}')
+        # append() starts a new chunk whenever a value cannot be stacked onto the first one
+        if isinstance(self.values[0], np.ndarray) and self.values[0].dtype != object:
+            name += '.npy'
+            with open(name + '.tmp', 'wb') as f:
+                np.save(f, np.stack(self.values))
+        else:
+            name += '.pkl'
+            with open(name + '.tmp', 'wb') as f:
+                pickle.dump(self.values, f, protocol=5)
+        os.replace(name + '.tmp', name)
+        with open(os.path.join(self.path, 'index.bin'), 'ab') as f:
+            f.write(np.array(self.index, dtype=INDEX_DTYPE).tobytes())
+        self.chunk += 1
+        self.values = []
+        self.index = []
+
+
+class Chunk_Reader():
+    """
+    Random access to the messages of one recorded connection. Array chunks are memory mapped, pickled chunks loaded on first access.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        index_path = os.path.join(path, 'index.bin')
+        self.index = np.fromfile(index_path, dtype=INDEX_DTYPE) if os.path.exists(index_path) else np.zeros(0, dtype=INDEX_DTYPE)
+        self._chunks = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def _chunk(self, i):
+        if i not in self._chunks:
+            name = os.path.join(self.path, f'chunk_{i:06d}')
+            if os.path.exists(name + '.npy'):
+                self._chunks = {i: np.load(name + '.npy', mmap_mode='r')}
+            else:
+                with open(name + '.pkl', 'rb') as f:
+                    self._chunks = {i: pickle.load(f)}
+        return self._chunks[i]
+
+    def __getitem__(self, i):
+        """
+        (emit time, clock, value) of the i-th message.
+        """
+        t, ctr, chunk, row = self.index[i]
+        value = self._chunk(int(chunk))[int(row)]
+        if isinstance(value, np.memmap):
+            # detach from the file, the chunk may be closed once the next one is read
+            value = np.array(value)
+        return float(t), int(ctr), value
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+# === Recording (executor side) =================
+class Recording_Control(SHM_Block):
+    """
+    Shared between gui and executor: the current session number and which connections are recorded.
+    The gui flips the flags while the pipeline runs, the emitting nodes check them on every emit.
+    """
+
+    _views = ('_session', 'enabled')
+
+    def __init__(self, keys, base_path, name=None):
+        self.keys = list(keys)
+        self.index = {k: i for i, k in enumerate(self.keys)}
+        self.base_path = base_path
+
+        super().__init__(8 + max(len(self.keys), 1), name=name)
+        self._session = np.ndarray((1,), dtype=np.int64, buffer=self._shm.buf)
+        self.enabled = np.ndarray((max(len(self.keys), 1),), dtype=np.uint8, buffer=self._shm.buf, offset=8)
+        if self.owner:
+            self._session[0] = 0
+            self.enabled[:] = 0
+
+    def _args(self):
+        return self.keys, self.base_path
+
+    @property
+    def session(self):
+        return int(self._session[0])
+
+    def start(self, keys):
+        """
+        Starts a new session recording the given connections, returns its directory.
+        """
+        session = next_session(self.base_path)
+        path = session_path(self.base_path, session)
+        write_manifest(path, {key: f'con_{self.index[key]:03d}' for key in keys})
+        self._session[0] = session
+        self.enabled[:] = 0
+        for key in keys:
+            self.enabled[self.index[key]] = 1
+        return path
+
+    def stop(self):
+        self.enabled[:] = 0
+
+    def is_recording(self):
+        return bool(self.enabled[:len(self.keys)].any())
+
+
+class Connection_Recorder():
+    """
+    Records the values a node emits on its connections while the Recording_Control says so.
+    attach() wraps the node's _emit_data (on top of any other wrapper) and stop, so that pending chunks are written when the node stops.
+    """
+
+    def __init__(self, control, outputs):
+        """
+        outputs: emit port key -> connection rows in the control leaving it
+        """
+        self.control = control
+        self.outputs = outputs
+        self.writers = {}
+
+    @classmethod
+    def for_node(cls, control, node):
+        outputs = {}
+        for con in node.output_connections:
+            if con.serialize_compact() in control.index:
+                outputs.setdefault(con._emit_port.key, []).append(control.index[con.serialize_compact()])
+        return cls(control, outputs)
+
+    def __getstate__(self):
+        return {'control': self.control, 'outputs': self.outputs}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def attach(self, node):
+        node._emit_data = Emit_Hook(self, node, node._emit_data)
+        node.stop = Flush_On_Stop(self, node, node.stop)
+
+    def emitted(self, channel, clock, data):
+        session = self.control.session
+        if len(self.writers) > 0:
+            # write out what was recorded on connections that stopped recording
+            for key in [k for k in self.writers if k[0] != session or not self.control.enabled[k[1]]]:
+                self.writers.pop(key).flush()
+
+        for row in self.outputs.get(channel, []):
+            if session == 0 or not self.control.enabled[row]:
+                continue
+            if (session, row) not in self.writers:
+                self.writers[(session, row)] = Chunk_Writer(os.path.join(session_path(self.control.base_path, session), f'con_{row:03d}'))
+            self.writers[(session, row)].append(clock, data)
+
+    def flush(self):
+        for writer in self.writers.values():
+            writer.flush()
+        self.writers = {}
+
+
+# === Replay (executor side) =================
+class Ports_replay(Ports_collection):
+    pass
+
+
+class Replay_Source(Producer_async):
+    """
+    Emits recorded messages in place of the node that originally emitted them, with their original clock values.
+
+    speed: 1 replays in real time, N N times faster, 0 as fast as possible.
+    The output ports are the ones of the replaced node, so that the downstream nodes can be connected as before.
+    """
+
+    ports_out = Ports_replay()
+
+    category = "Data Source"
+    description = ""
+
+    example_init = {'name': 'Replay', 'recordings': {}, 'speed': 1}
+
+    def __init__(self, name='Replay', recordings={}, speed=1, ports_out=None, replaces=None, **kwargs):
+        super().__init__(name=name, **kwargs)
+        if ports_out is not None:
+            self.ports_out = ports_out
+        # str() of the replaced node, its connections keep their keys in the connection stats
+        self.replaces = replaces
+        # emit port key -> recording directory
+        self.recordings = recordings
+        self.speed = speed
+
+    def _settings(self):
+        return {'recordings': self.recordings, 'speed': self.speed}
+
+    def _messages(self):
+        # all ports merged in emit order
+        messages = []
+        for key, path in self.recordings.items():
+            reader = Chunk_Reader(path)
+            messages.extend((t, i, key, reader) for i, t in enumerate(reader.index['time']))
+        return sorted(messages, key=lambda m: m[0])
+
+    async def _async_run(self):
+        messages = self._messages()
+        if len(messages) == 0:
+            self.warn('Recording is empty')
+            return
+        self.info(f'Replaying {len(messages)} messages at {self.speed or "max"} speed')
+
+        t_first, started = messages[0][0], time.time()
+        for t, i, key, reader in messages:
+            if self.speed > 0:
+                delay = (t - t_first) / self.speed - (time.time() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            _, ctr, value = reader[i]
+            # emitted with the recorded clock, so that nodes joining several replayed streams still match them up
+            self._ctr = ctr
+            yield {key: value}
+
+
+def apply_replay(pipeline, replay):
+    """
+    Replaces the emitting side of all connections recorded in the replay's session by Replay_Source nodes.
+    Returns a node of the graph to start from. Nodes only connected to the pipeline via recorded connections are not started.
+    """
+    recordings = read_manifest(replay['path'])
+    nodes = pipeline.discover_graph(pipeline)
+    connections = {con.serialize_compact(): con for node in nodes for con in node.input_connections}
+
+    sources = {}
+    for key, path in recordings.items():
+        if key not in connections:
+            logger.warning(f'Recorded connection {key} is not part of the pipeline anymore, skipping')
+            continue
+        con = connections[key]
+        emit_node = con._emit_node
+        if emit_node not in sources:
+            sources[emit_node] = Replay_Source(name=emit_node.name, recordings={}, speed=replay.get('speed', 1), ports_out=emit_node.ports_out, replaces=str(emit_node), should_time=emit_node.should_time)
+        source = sources[emit_node]
+        # a port with several recorded connections carries the same values on each, one recording suffices
+        source.recordings.setdefault(con._emit_port.key, path)
+        con._recv_node.remove_input_by_connection(con)
+        con._recv_node.add_input(source, emit_port=con._emit_port, recv_port=con._recv_port)
+
+    if len(sources) == 0:
+        raise ValueError(f'No connection of {replay["path"]} found in the pipeline')
+    return next(iter(sources.values()))
@@ -0,0 +1,333 @@
+import os
+import time
+import pickle
+import threading as th
+from collections import deque
+
+import numpy as np
+
+import logging
+logger = logging.getLogger('LN-Studio')
+
+from ln_studio.utils.node_hooks import Flush_On_Stop
+from ln_studio.utils.shm_block import SHM_Block, align
+
+# bytes per node for its latest report
+REPORT_SLOT_SIZE = int(os.getenv('LNS_REPORT_SLOT_SIZE', 64 * 1024))
+# arrays in a node's current state larger than this are sent as Array_Summary (with as many leading rows as fit into this)
+STATE_ARRAY_BYTES = int(os.getenv('LNS_REPORT_ARRAY_BYTES', 4 * 1024))
+# items sent per container in a node's current state, the state inspector does not show more either
+STATE_ITEMS = 100
+# minimum time between two writes of the same node, reports in between are merged
+REPORT_INTERVAL = float(os.getenv('LNS_REPORT_INTERVAL_MS', 30)) / 1000
+# log lines kept in a report (at most this many lines and bytes of text), older lines not read by then are lost
+LOG_TAIL = 500
+LOG_TAIL_BYTES = int(os.getenv('LNS_REPORT_LOG_BYTES', 16 * 1024))
+# longer log lines are cut, a single line must not take the whole tail
+LOG_LINE_CHARS = 1000
+
+# slot meta (int64): sequence, payload length, enabled flag, dropped
+_SEQ, _LEN, _ENABLED, _DROPPED = range(4)
+_META_LEN = 4
+
+
+class Report_Channel(SHM_Block):
+    """
+    Reports of all nodes of a pipeline from the executor to the gui, in a single shared memory block instead of one queue (and feeder thread) per node.
+
+    Every node has a slot holding its latest report, guarded by a seqlock like the draw rings: writing never blocks, the reader retries or skips torn reads.
+    A report is (run, {key: (version, value)}), readers only look at keys whose version changed since they last read the slot.
+    Versions count per run (ie per executor side writer), a reader seeing a new run starts over.
+    Slots are only written while enabled by the reader, see set_enabled.
+    """
+
+    _views = ('_slots', '_meta')
+
+    def __init__(self, names, slot_size=REPORT_SLOT_SIZE, name=None):
+        self.names = list(names)
+        self.index = {n: i for i, n in enumerate(self.names)}
+        self.slot_size = align(slot_size)
+
+        slot_bytes = 8 * _META_LEN + self.slot_size
+        super().__init__(max(len(self.names), 1) * slot_bytes, name=name)
+        self._slots = np.ndarray((max(len(self.names), 1), slot_bytes), dtype=np.uint8, buffer=self._shm.buf)
+        self._meta = [slot[:8 * _META_LEN].view(np.int64) for slot in self._slots]
+        if self.owner:
+            for meta in self._meta:
+                meta[:] = 0
+        # reader side: last sequence read per slot
+        self._read = [0] * len(self.names)
+
+    def _args(self):
+        return self.names, self.slot_size
+
+    def set_enabled(self, node_name, enabled):
+        self._meta[self.index[node_name]][_ENABLED] = int(enabled)
+
+    def is_enabled(self, node_name):
+        return bool(self._meta[self.index[node_name]][_ENABLED])
+
+    # === Writer (executor) =================
+    def write(self, node_name, report):
+        idx = self.index[node_name]
+        payload = pickle.dumps(report, protocol=5)
+        if len(payload) > self.slot_size:
+            self._meta[idx][_DROPPED] += 1
+            return False
+
+        meta = self._meta[idx]
+        seq = abs(int(meta[_SEQ])) + 1
+        # mark slot as being written, so that a concurrent reader discards it
+        meta[_SEQ] = -seq
+        meta[_LEN] = len(payload)
+        self._slots[idx, 8 * _META_LEN:8 * _META_LEN + len(payload)] = np.frombuffer(payload, dtype=np.uint8)
+        meta[_SEQ] = seq
+        return True
+
+    # === Reader (gui) =================
+    def read(self, node_name, retries=2):
+        """
+        Returns the latest report of the node, None if it did not change since the last read.
+        """
+        idx = self.index[node_name]
+        meta = self._meta[idx]
+        for _ in range(retries + 1):
+            seq = int(meta[_SEQ])
+            if seq == self._read[idx]:
+                return None
+            if seq < 0:
+                continue
+            length = int(meta[_LEN])
+            payload = self._slots[idx, 8 * _META_LEN:8 * _META_LEN + length].tobytes()
+            if int(meta[_SEQ]) != seq:
+                # writer lapped us while copying
+                continue
+            self._read[idx] = seq
+            return pickle.loads(payload)
+        return None
+
+    def stats(self, node_name):
+        meta = self._meta[self.index[node_name]]
+        return {'written': abs(int(meta[_SEQ])), 'dropped': int(meta[_DROPPED])}
+
+
+# === Current state (executor) =================
+class Array_Summary():
+    """
+    Stands in for an array of a node's current state that is too large to be sent with every report: dtype, shape, range and its first rows.
+    """
+
+    def __init__(self, array, max_bytes=STATE_ARRAY_BYTES):
+        self.dtype = array.dtype
+        self.shape = array.shape
+        self.min = self.max = None
+        if array.size > 0 and np.issubdtype(array.dtype, np.number):
+            self.min, self.max = np.nanmin(array), np.nanmax(array)
+        self.head = None
+        if array.ndim > 0 and array.shape[0] > 0:
+            rows = min(max_bytes // max(array[0].nbytes, 1), array.shape[0])
+            if rows > 0:
+                self.head = np.array(array[:rows])
+
+
+class Truncated(list):
+    """
+    First items of a longer list, tuple or dict (as (key, value) pairs), `total` is the original length.
+    """
+
+    def __init__(self, items, total, kind):
+        super().__init__(items)
+        self.total = total
+        self.kind = kind
+
+
+def reduce_state(value, max_bytes=STATE_ARRAY_BYTES, max_items=STATE_ITEMS):
+    """
+    Copy of a node's current state small enough for the report slot: large arrays are summarized, long containers cut.
+    Small values are passed through as they are.
+    """
+    if isinstance(value, np.ndarray):
+        return value if value.nbytes <= max_bytes else Array_Summary(value, max_bytes)
+    if isinstance(value, dict):
+        items = [(k, reduce_state(v, max_bytes, max_items)) for k, v in list(value.items())[:max_items]]
+        return dict(items) if len(value) <= max_items else Truncated(items, len(value), 'dict')
+    if isinstance(value, (list, tuple, deque)):
+        items = [reduce_state(v, max_bytes, max_items) for v in list(value)[:max_items]]
+        if len(value) <= max_items:
+            return type(value)(items) if isinstance(value, (list, tuple)) else items
+        return Truncated(items, len(value), type(value).__name__)
+    return value
+
+
+# === Reports (executor) =================
+class _Deferred_Flush():
+    """
+    One thread per process writing the reports of nodes that reported within the interval of their last write, so that the
+    last report before a node goes quiet is not held back until it reports again.
+    """
+
+    def __init__(self):
+        self.pending = set()
+        self.cond = th.Condition()
+        self.thread = None
+
+    def schedule(self, writer):
+        with self.cond:
+            self.pending.add(writer)
+            if self.thread is None:
+                self.thread = th.Thread(target=self.run, name="LN-Reports", daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while len(self.pending) == 0:
+                    self.cond.wait()
+                now = time.time()
+                writers = [w for w in self.pending if now >= w.last_write + w.interval]
+                if len(writers) == 0:
+                    # woken up early if another writer is scheduled, it might be due sooner
+                    self.cond.wait(min(w.last_write + w.interval for w in self.pending) - now)
+                    continue
+                self.pending.difference_update(writers)
+            for writer in writers:
+                try:
+                    writer.flush()
+                except Exception:
+                    logger.exception(f'Could not write the reports of {writer.node_name}')
+
+
+_deferred = None
+_deferred_lock = th.Lock()
+
+
+def _deferred_flush():
+    global _deferred
+    with _deferred_lock:
+        if _deferred is None:
+            _deferred = _Deferred_Flush()
+        return _deferred
+
+
+class Report_Writer():
+    """
+    Reporter of one node writing into its Report_Channel slot, picklable so that it can be registered on the executor side node.
+
+    Reports are merged into the node's latest values, which are written at most every `interval` seconds (exceptions immediately),
+    reports arriving in between are written once the interval passed and when the node stops.
+    Logs are sent as the tail of (level, text) tuples, the current state reduced to what fits into the slot (see reduce_state).
+    """
+
+    def __init__(self, channel, node_name, interval=REPORT_INTERVAL):
+        self.channel = channel
+        self.node_name = node_name
+        self.interval = interval
+        self.latest = {}
+        self.logs = deque()
+        self.log_bytes = 0
+        self.level = logging.INFO
+        self.last_write = 0
+        # versions start over in every process the writer is unpickled in (eg after a hot restart), tells readers to forget theirs
+        self.run = (os.getpid(), time.time_ns())
+        # the node's threads report, the deferred flush and stop write
+        self._lock = th.RLock()
+        # (version, reduced state) of the last reduced current state, reduced once not on every write
+        self._reduced = None
+
+    def __getstate__(self):
+        # every process starts with an empty report
+        return {'channel': self.channel, 'node_name': self.node_name, 'interval': self.interval}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def attach(self, node):
+        """
+        Called by the executor with the node this writer is registered on: wraps its log methods, so that log reports carry their level.
+        """
+        for fn_name, level in [('debug', logging.DEBUG), ('info', logging.INFO), ('warn', logging.WARNING), ('error', logging.ERROR), ('exception', logging.ERROR)]:
+            setattr(node, fn_name, _Log_With_Level(self, node, fn_name, level))
+        # the node's last values and logs are written before it goes away
+        node.stop = Flush_On_Stop(self, node, node.stop)
+
+    def __call__(self, **kwargs):
+        if not self.channel.is_enabled(self.node_name):
+            return
+
+        # TODO: clean this up and move it into the Time_per_call etc reporters
+        if 'node' in kwargs and 'latency' not in kwargs:
+            node = kwargs.pop('node')
+            processing_duration = node._perf_user_fn.average()
+            invocation_duration = node._perf_framework.average()
+            kwargs['latency'] = {
+                "process": processing_duration,
+                "invocation": invocation_duration,
+                "time_between_calls": (invocation_duration - processing_duration) * 1000
+            }
+
+        with self._lock:
+            if 'log' in kwargs:
+                self._append_log(kwargs.pop('log'))
+                kwargs['log'] = self.logs
+            for key, val in kwargs.items():
+                version = self.latest[key][0] + 1 if key in self.latest else 1
+                self.latest[key] = (version, val)
+
+        # the node is likely about to crash, do not wait for the next report
+        if kwargs.get('exc_info') or time.time() - self.last_write >= self.interval:
+            self.flush()
+        else:
+            _deferred_flush().schedule(self)
+
+    def _append_log(self, text):
+        text = str(text)
+        if len(text) > LOG_LINE_CHARS:
+            text = text[:LOG_LINE_CHARS] + '…'
+        self.logs.append((self.level, text))
+        self.log_bytes += len(text)
+        while len(self.logs) > 1 and (len(self.logs) > LOG_TAIL or self.log_bytes > LOG_TAIL_BYTES):
+            self.log_bytes -= len(self.logs.popleft()[1])
+
+    def _report(self, max_bytes=STATE_ARRAY_BYTES, max_items=STATE_ITEMS):
+        report = dict(self.latest)
+        if 'log' in report and max_items != STATE_ITEMS:
+            version, logs = report['log']
+            report['log'] = (version, list(logs)[-max_items:])
+        if 'current_state' in report:
+            version, state = report['current_state']
+            if max_bytes != STATE_ARRAY_BYTES or max_items != STATE_ITEMS:
+                report['current_state'] = (version, reduce_state(state, max_bytes, max_items))
+            else:
+                if self._reduced is None or self._reduced[0] != version:
+                    self._reduced = (version, reduce_state(state))
+                report['current_state'] = self._reduced
+        return self.run, report
+
+    def flush(self):
+        if not self.channel.is_enabled(self.node_name):
+            return
+        with self._lock:
+            if not self.channel.write(self.node_name, self._report()):
+                # still too large (eg many arrays just below the limit): only summaries and the last few log lines
+                self.channel.write(self.node_name, self._report(max_bytes=0, max_items=10))
+            self.last_write = time.time()
+
+
+class _Log_With_Level():
+    """
+    Log method of a node that tells the node's Report_Writer the level of the log report it is about to receive (see node_hooks for why a class).
+    """
+
+    def __init__(self, writer, node, fn_name, level):
+        self.writer = writer
+        self.node = node
+        self.fn_name = fn_name
+        self.level = level
+
+    def __call__(self, *text):
+        self.writer.level = self.level
+        try:
+            return getattr(type(self.node), self.fn_name)(self.node, *text)
+        finally:
+            self.writer.level = logging.INFO
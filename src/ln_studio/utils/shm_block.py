@@ -0,0 +1,67 @@
+import os
+import weakref
+from multiprocessing import shared_memory
+
+import logging
+logger = logging.getLogger('LN-Studio')
+
+_ALIGN = 64
+
+
+def align(n, to=_ALIGN):
+    return (n + to - 1) // to * to
+
+
+class SHM_Block():
+    """
+    Base of the structures the gui shares with the executor processes in a single shared memory block.
+
+    The process creating the block (name=None) owns it: it initializes the contents (see `owner`) and unlinks the block once closed or collected.
+    Other processes attach by name, pickling only sends the constructor arguments returned by `_args()` and the block's name, which must be the last argument.
+    Subclasses list the attributes holding numpy views into the block in `_views`, close() releases them before closing the block.
+    """
+
+    _views = ()
+
+    def __init__(self, size, name=None):
+        self._owner_pid = os.getpid() if name is None else None
+        self._shm = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self._finalizer = weakref.finalize(self, self._cleanup, self._shm, self._owner_pid, self.__class__.__name__)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def owner(self):
+        return self._owner_pid is not None
+
+    def _args(self):
+        """
+        Constructor arguments other than the name, to attach to the block in another process.
+        """
+        raise NotImplementedError()
+
+    def __reduce__(self):
+        # attach by name in other processes, only the creating process unlinks
+        return self.__class__, (*self._args(), self.name)
+
+    def close(self):
+        # release the numpy views first, otherwise the shared memory cannot be closed
+        for attr in self._views:
+            setattr(self, attr, None)
+        self._finalizer()
+
+    @staticmethod
+    def _cleanup(shm, owner_pid, kind):
+        if owner_pid == os.getpid():
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                # already unlinked elsewhere
+                pass
+        try:
+            shm.close()
+        except BufferError:
+            # numpy views are still exported, the mapping is released once the process exits
+            logger.debug(f'Could not close {kind} {shm.name}, views still exported')
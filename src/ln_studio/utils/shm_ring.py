@@ -0,0 +1,203 @@
+import os
+import time
+import pickle
+
+import numpy as np
+
+from ln_studio.utils.shm_block import SHM_Block, align
+
+# number of frames a view can lag behind the executor before frames are overwritten
+RING_SLOTS = int(os.getenv('LNS_RING_SLOTS', 4))
+# while paused, one frame per this many seconds is still written, so that a view shown again starts from its latest state
+PAUSED_WRITE_INTERVAL = float(os.getenv('LNS_RING_PAUSED_WRITE_S', 1))
+# maximum number of out-of-band (ie numpy) buffers per frame, frames with more buffers are pickled in-band
+MAX_BUFFERS = 16
+
+# ring header (int64): last written sequence, last read sequence, overwritten, dropped, skipped, paused flag, suppressed
+_WRITE, _READ, _OVERWRITTEN, _DROPPED, _SKIPPED, _PAUSED, _SUPPRESSED = range(7)
+_HEADER_LEN = 7
+# slot meta (int64): payload length, number of buffers, length of each buffer
+_META_LEN = 2 + MAX_BUFFERS
+
+
+class SHM_Ring_Buffer(SHM_Block):
+    """
+    Single producer / single consumer ring buffer in shared memory, used to hand the draw state of a View node from the executor to the gui.
+
+    The writer never blocks: each slot is guarded by its sequence number (seqlock), so the reader detects frames that were overwritten while copying them.
+    Numpy arrays are pickled out-of-band (protocol 5) and copied directly into the slot, the reader copies a slot once and hands out views into that copy.
+
+    Counters (shared between both processes):
+    - overwritten: frames replaced in the ring before the reader got to them
+    - dropped: frames that could not be stored (too large) or were torn while reading
+    - skipped: frames superseded by a newer frame before the reader asked for one
+    - suppressed: frames not written at all, because the reader paused the ring (eg its view is hidden).
+      Even while paused a frame is written every PAUSED_WRITE_INTERVAL seconds, views that emit rarely are not blank once resumed.
+    """
+
+    _views = ('_header', '_seqs', '_slots')
+
+    def __init__(self, slot_size, slots=RING_SLOTS, name=None):
+        self.slot_size = align(slot_size)
+        self.slots = slots
+
+        slot_bytes = 8 * _META_LEN + self.slot_size
+        super().__init__(8 * _HEADER_LEN + slots * (8 + slot_bytes), name=name)
+
+        buf = self._shm.buf
+        self._header = np.ndarray((_HEADER_LEN, ), dtype=np.int64, buffer=buf)
+        self._seqs = np.ndarray((slots, ), dtype=np.int64, buffer=buf, offset=8 * _HEADER_LEN)
+        self._slots = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=buf, offset=8 * _HEADER_LEN + 8 * slots)
+
+        if self.owner:
+            self._header[:] = 0
+            self._seqs[:] = 0
+        # writer side: when the last frame was written while paused
+        self._paused_write = 0
+
+    def _args(self):
+        return self.slot_size, self.slots
+
+    # === Writer (executor) =================
+    def write(self, **kwargs):
+        if self._header[_PAUSED]:
+            now = time.time()
+            if now - self._paused_write < PAUSED_WRITE_INTERVAL:
+                # nobody looks at this view, skip pickling and copying
+                self._header[_SUPPRESSED] += 1
+                return False
+            self._paused_write = now
+
+        buffers = []
+        payload = pickle.dumps(kwargs, protocol=5, buffer_callback=buffers.append)
+        if len(buffers) > MAX_BUFFERS:
+            buffers = []
+            payload = pickle.dumps(kwargs, protocol=5)
+        raws = [b.raw() for b in buffers]
+
+        total = align(len(payload)) + sum(align(r.nbytes) for r in raws)
+        if total > self.slot_size:
+            self._header[_DROPPED] += 1
+            return False
+
+        seq = self._header[_WRITE] + 1
+        idx = seq % self.slots
+        if self._seqs[idx] > self._header[_READ]:
+            self._header[_OVERWRITTEN] += 1
+
+        # mark slot as being written, so that a concurrent reader discards it
+        self._seqs[idx] = -1
+        slot = self._slots[idx]
+        meta = slot[:8 * _META_LEN].view(np.int64)
+        meta[0] = len(payload)
+        meta[1] = len(raws)
+
+        data = slot[8 * _META_LEN:]
+        pos = len(payload)
+        data[:pos] = np.frombuffer(payload, dtype=np.uint8)
+        for i, raw in enumerate(raws):
+            pos = align(pos)
+            meta[2 + i] = raw.nbytes
+            data[pos:pos + raw.nbytes] = np.frombuffer(raw, dtype=np.uint8)
+            pos += raw.nbytes
+
+        self._seqs[idx] = seq
+        self._header[_WRITE] = seq
+        return True
+
+    # === Reader (gui) =================
+    def read(self, retries=2):
+        """
+        Returns the newest frame not read yet or an empty dict if there is none (same contract as View.get_current_state).
+        """
+        for _ in range(retries + 1):
+            seq = self._header[_WRITE]
+            last = self._header[_READ]
+            if seq <= last:
+                return {}
+
+            idx = seq % self.slots
+            if self._seqs[idx] != seq:
+                continue
+            slot = self._slots[idx].copy()
+            if self._seqs[idx] != seq:
+                # writer lapped us while copying
+                continue
+
+            self._header[_SKIPPED] += seq - last - 1
+            self._header[_READ] = seq
+            return self._decode(slot)
+
+        self._header[_DROPPED] += 1
+        return {}
+
+    def read_all(self):
+        """
+        Returns all frames not read yet that are still in the ring (oldest first), for views that need every frame (eg time series).
+        """
+        seq = int(self._header[_WRITE])
+        last = int(self._header[_READ])
+        frames = []
+        # older frames were overwritten already and are counted as such
+        for s in range(max(last + 1, seq - self.slots + 1), seq + 1):
+            idx = s % self.slots
+            if self._seqs[idx] != s:
+                # already being overwritten by a newer frame
+                self._header[_DROPPED] += 1
+                continue
+            slot = self._slots[idx].copy()
+            if self._seqs[idx] != s:
+                # lapped while copying
+                self._header[_DROPPED] += 1
+                continue
+            frames.append(self._decode(slot))
+        self._header[_READ] = seq
+        return frames
+
+    def set_paused(self, paused):
+        """
+        While paused the writer discards frames instead of storing them, read() keeps returning the frames written before.
+        """
+        self._header[_PAUSED] = int(paused)
+
+    @property
+    def paused(self):
+        return bool(self._header[_PAUSED])
+
+    @staticmethod
+    def _decode(slot):
+        meta = slot[:8 * _META_LEN].view(np.int64)
+        data = slot[8 * _META_LEN:]
+        pos = int(meta[0])
+        payload = data[:pos]
+        buffers = []
+        for i in range(int(meta[1])):
+            pos = align(pos)
+            length = int(meta[2 + i])
+            buffers.append(data[pos:pos + length])
+            pos += length
+        return pickle.loads(payload, buffers=buffers)
+
+    def stats(self):
+        return {
+            'written': int(self._header[_WRITE]),
+            'read': int(self._header[_READ]),
+            'overwritten': int(self._header[_OVERWRITTEN]),
+            'dropped': int(self._header[_DROPPED]),
+            'skipped': int(self._header[_SKIPPED]),
+            'suppressed': int(self._header[_SUPPRESSED]),
+        }
+
+
+def attach_ring_buffer(node, ring=None):
+    """
+    Routes the draw state of a View node through a ring buffer instead of its single shared memory slot.
+    Must be called before the node is handed to the executor, returns the ring buffer.
+    Nodes that need more than the newest frame (eg time series) set the number of frames the ring holds via `draw_slots`.
+    """
+    if ring is None:
+        ring = SHM_Ring_Buffer(slot_size=node._shm_size, slots=getattr(node, 'draw_slots', RING_SLOTS))
+    node._emit_draw = ring.write
+    node.get_current_state = ring.read
+    node.get_current_states = ring.read_all
+    return ring
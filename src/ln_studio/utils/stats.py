@@ -0,0 +1,118 @@
+import csv
+import time
+from collections import deque
+
+import numpy as np
+
+# log spaced bins from 1us to 100s, fine enough for percentiles, small enough to ship between processes
+_EDGES = np.logspace(-6, 2, 161)
+
+
+class Latency_Histogram():
+    """
+    Fixed size histogram of durations (in seconds), used to summarize per call timings without keeping every sample.
+    Histograms can be merged, eg to combine the summaries sent by the executor over time.
+    """
+
+    def __init__(self):
+        # first and last bin catch everything below / above the edges
+        self.counts = np.zeros(len(_EDGES) + 1, dtype=np.int64)
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def add(self, seconds):
+        self.counts[np.searchsorted(_EDGES, seconds)] += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    def mean(self):
+        n = self.count
+        return self.total / n if n > 0 else 0.0
+
+    def percentile(self, q):
+        """
+        Upper edge of the bin containing the q-th percentile (0-100), 0 if empty.
+        """
+        n = self.count
+        if n == 0:
+            return 0.0
+        idx = int(np.searchsorted(np.cumsum(self.counts), np.ceil(n * q / 100)))
+        if idx >= len(_EDGES):
+            # overflow bin
+            return float(self.max)
+        return float(min(_EDGES[idx], self.max))
+
+
+class Frame_Stats():
+    """
+    Frame timings of one view: update durations (recorded by the render scheduler), draw durations and skipped frames (recorded by the view).
+    Only draws are frames, an update that found nothing new to draw is not.
+    """
+    # seconds over which the current fps are averaged
+    FPS_WINDOW = 1.0
+
+    def __init__(self):
+        self.update = Latency_Histogram()
+        self.draw = Latency_Histogram()
+        self.skipped = 0
+        self.drawn = 0
+        self.started = time.perf_counter()
+        self._recent = deque(maxlen=1000)
+
+    @property
+    def frames(self):
+        return self.drawn
+
+    def add_update(self, seconds):
+        self.update.add(seconds)
+
+    def add_draw(self, seconds):
+        self.draw.add(seconds)
+        self.drawn += 1
+        self._recent.append(time.perf_counter())
+
+    def fps(self):
+        # frames finished within the last FPS_WINDOW seconds
+        since = time.perf_counter() - self.FPS_WINDOW
+        return sum(1 for t in self._recent if t >= since) / self.FPS_WINDOW
+
+    def summary(self):
+        """
+        Flat dict of the totals, durations in ms.
+        """
+        duration = time.perf_counter() - self.started
+        draw = self.draw
+        return {
+            'frames': self.frames,
+            'fps': self.frames / max(duration, 1e-9),
+            'skipped': self.skipped,
+            'update_mean_ms': self.update.mean() * 1000,
+            'update_p99_ms': self.update.percentile(99) * 1000,
+            'draw_mean_ms': draw.mean() * 1000,
+            'draw_p50_ms': draw.percentile(50) * 1000,
+            'draw_p99_ms': draw.percentile(99) * 1000,
+            'draw_max_ms': draw.max * 1000,
+        }
+
+
+def write_frame_stats_csv(path, stats):
+    """
+    One row per view, stats: {view name: Frame_Stats}.
+    """
+    rows = [{'view': name, **s.summary()} for name, s in stats.items()]
+    if len(rows) == 0:
+        return
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
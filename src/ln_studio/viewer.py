@@ -0,0 +1,64 @@
+"""
+View node types that are drawn by widgets built into LN-Studio.
+
+Node packages import these in the executor as well, so this module must not import any qt modules.
+"""
+import os
+import math
+
+from livenodes import viewer
+from livenodes.viewer import FPS_Helper, print_fps
+
+from ln_studio.utils.shm_ring import RING_SLOTS
+
+# lowest frame rate a time series view is expected to draw at, its draw ring holds the chunks emitted in two such frames
+TIMESERIES_MIN_FPS = float(os.getenv('LNS_TIMESERIES_MIN_FPS', 10))
+
+
+class View_Timeseries(viewer.View, abstract_class=True):
+    """
+    Multi channel line plot drawn natively with QPainter (see ln_studio.components.views.timeseries), for rates and channel counts matplotlib cannot keep up with.
+
+    Nodes only emit their new samples, the widget keeps the history:
+        self._emit_draw(data=<array (time, channels) or (batch, time, channels)>, channel_names=<optional list of str>)
+
+    Unlike other views every emitted chunk is drawn, not only the newest one, as long as the draw ring can hold all chunks emitted between
+    two frames: nodes emitting more than plot_emit_rate chunks per second, or views capped below TIMESERIES_MIN_FPS, lose chunks.
+    The plot is configured by the attributes below, which nodes may override (eg from their settings).
+    """
+    # upper bound of the chunks emitted per second, sizes the draw ring
+    plot_emit_rate = 100
+    # seconds of history shown
+    plot_window = 10
+    # samples per second, together with plot_window this sets the size of the history buffer
+    plot_sample_rate = 1000
+    # (min, max) per channel, None to scale each channel to its visible range
+    plot_ylim = None
+
+    @property
+    def draw_slots(self):
+        return max(RING_SLOTS, math.ceil(2 * self.plot_emit_rate / TIMESERIES_MIN_FPS))
+
+    def init_draw(self, view):
+        """
+        Returns an update function that hands all draw states emitted since the last call to view.append() and returns whether there were any.
+        """
+        if self.should_time:
+            self.fps = FPS_Helper(str(self), report_every_x_seconds=0.5)
+        else:
+            self.fps = FPS_Helper(str(self))
+            self.fps.register_reporter(print_fps)
+
+        def update():
+            # only available with a draw ring, otherwise we fall back to the newest state
+            states = self.get_current_states() if hasattr(self, 'get_current_states') else [self.get_current_state()]
+            drawn = False
+            for state in states:
+                if self._should_draw(**state):
+                    view.append(**state)
+                    drawn = True
+            if drawn:
+                self.fps.count()
+            return drawn
+
+        return update
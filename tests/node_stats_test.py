@@ -0,0 +1,50 @@
+import pickle
+
+import numpy as np
+
+from ln_studio.utils.node_stats import Node_Stats_Table, Node_Stats_Writer, node_rates, CALLS, BUSY, BACKLOG
+
+
+class _Timing():
+    def __init__(self):
+        self.calls = [0]
+
+
+class _Node():
+    def __init__(self):
+        self._perf_user_fn = _Timing()
+
+
+class TestNodeStats():
+
+    def test_writer(self):
+        table = Node_Stats_Table(['a', 'b'])
+        # the executor side writer attaches by name
+        writer = pickle.loads(pickle.dumps(Node_Stats_Writer(table, 'b')))
+        node = _Node()
+
+        writer(log='ignored')
+        for duration in [0.1, 0.3]:
+            node._perf_user_fn.calls.append(duration)
+            writer(node=node)
+        # blocking producers report each message without arguments
+        producer = pickle.loads(pickle.dumps(Node_Stats_Writer(table, 'a')))
+        producer()
+
+        _, sample = table.sample()
+        assert sample[0, CALLS] == 1
+        assert sample[1, CALLS] == 2
+        assert np.isclose(sample[1, BUSY], 0.4)
+        # no data storage: nothing waiting
+        assert sample[1, BACKLOG] == 0
+        table.close()
+
+    def test_rates(self):
+        a = np.zeros((2, 4))
+        b = np.zeros((2, 4))
+        b[0, CALLS], b[0, BUSY], b[0, BACKLOG] = 20, 1.0, 3
+        rate, per_call, load, backlog = node_rates((0, a), (2, b))
+        np.testing.assert_allclose(rate, [10, 0])
+        np.testing.assert_allclose(per_call, [0.05, 0])
+        np.testing.assert_allclose(load, [0.5, 0])
+        np.testing.assert_allclose(backlog, [3, 0])
@@ -0,0 +1,34 @@
+import os
+
+from ln_studio.utils import pipeline_cache
+
+
+class TestPipelineCache():
+
+    def test_cache(self, tmp_path):
+        pipeline_cache.clear()
+        path = tmp_path / 'pl.yml'
+        path.write_text("Nodes:\n  A [Sine]:\n    freq: 1\nInputs: []\n")
+
+        first = pipeline_cache.load_compact_yml(str(path))
+        assert first == {'Nodes': {'A [Sine]': {'freq': 1}}, 'Inputs': []}
+        # callers get their own copy
+        first['Nodes']['A [Sine]']['freq'] = 2
+        assert pipeline_cache.load_compact_yml(str(path))['Nodes']['A [Sine]']['freq'] == 1
+
+        # modified files are parsed again
+        path.write_text("Nodes: {}\nInputs: []\n")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert pipeline_cache.load_compact_yml(str(path)) == {'Nodes': {}, 'Inputs': []}
+        assert len(pipeline_cache._cache) == 1
+
+    def test_empty_and_lru(self, tmp_path, monkeypatch):
+        pipeline_cache.clear()
+        monkeypatch.setattr(pipeline_cache, 'CACHE_SIZE', 2)
+        paths = []
+        for i in range(3):
+            paths.append(tmp_path / f'pl_{i}.yml')
+            paths[-1].write_text('')
+            assert pipeline_cache.load_compact_yml(str(paths[-1])) is None
+        assert [k[0] for k in pipeline_cache._cache] == [str(p) for p in paths[1:]]
@@ -0,0 +1,80 @@
+import os
+import sys
+import json
+import time
+import threading as th
+
+from ln_studio.utils.profiler import Profile_Control, Profiler_Hook, Sampler, merge, node_shares, to_speedscope, collapse
+
+
+class _Node():
+    compute_on = ''
+
+    def __str__(self):
+        return 'Busy [Busy]'
+
+    def _process(self, until):
+        while time.time() < until:
+            pass
+
+    def _blocking_onstart(self, until):
+        while time.time() < until:
+            pass
+
+
+class TestProfiler():
+
+    def test_collapse(self):
+        node = _Node()
+        until = time.time() + 0.3
+        thread = th.Thread(target=node._process, args=(until,), name='worker')
+        thread.start()
+        time.sleep(0.05)
+        stack = collapse(sys._current_frames()[thread.ident], 'worker')
+        thread.join()
+        # rooted at the node, frames above its _process are cut
+        assert stack.startswith('[node] Busy [Busy];_process (profiler_test.py:')
+
+    def test_collapse_blocking(self):
+        # producer threads of blocking producers run in _blocking_onstart
+        node = _Node()
+        thread = th.Thread(target=node._blocking_onstart, args=(time.time() + 0.3,), name='worker')
+        thread.start()
+        time.sleep(0.05)
+        stack = collapse(sys._current_frames()[thread.ident], 'worker')
+        thread.join()
+        assert stack.startswith('[node] Busy [Busy];_blocking_onstart (profiler_test.py:')
+
+    def test_watch(self, tmp_path):
+        # a node stuck in one long call never reports, the watcher thread starts the sampler anyway
+        control = Profile_Control(str(tmp_path))
+        Profiler_Hook(control).attach(_Node())
+        node = _Node()
+        thread = th.Thread(target=node._process, args=(time.time() + 1,), name='worker')
+        thread.start()
+        path = control.start(0.3, interval=0.005)
+        thread.join()
+        control.close()
+        assert node_shares(merge(path)) == [('Busy [Busy]', 1.0)]
+
+    def test_merge(self, tmp_path):
+        node = _Node()
+        thread = th.Thread(target=node._process, args=(time.time() + 0.3,), name='worker')
+        thread.start()
+        sampler = Sampler(str(tmp_path), until=time.time() + 0.2, interval=0.005)
+        sampler.run()
+        thread.join()
+
+        counts = merge(str(tmp_path))
+        assert sum(counts.values()) > 0
+        assert all(stack.startswith(f'pid {os.getpid()};') for stack in counts)
+        assert node_shares(counts) == [('Busy [Busy]', 1.0)]
+        assert os.path.exists(tmp_path / 'profile.collapsed.txt')
+        with open(tmp_path / 'profile.speedscope.json') as f:
+            assert json.load(f)['profiles'][0]['endValue'] == sum(counts.values())
+
+    def test_speedscope(self):
+        profile = to_speedscope({'a;b': 2, 'a;c': 1})
+        assert [f['name'] for f in profile['shared']['frames']] == ['a', 'b', 'c']
+        assert profile['profiles'][0]['samples'] == [[0, 1], [0, 2]]
+        assert profile['profiles'][0]['weights'] == [2, 1]
@@ -0,0 +1,48 @@
+import os
+import pickle
+
+import numpy as np
+
+from ln_studio.utils.recording import Chunk_Writer, Chunk_Reader, Recording_Control, Connection_Recorder, read_manifest
+
+
+class TestRecording():
+
+    def test_chunks(self, tmp_path):
+        writer = Chunk_Writer(str(tmp_path), chunk_messages=2, chunk_seconds=10)
+        for i in range(3):
+            writer.append(i, np.full((2, 3), i), t=i)
+        # shape change and non array values start new chunks
+        writer.append(3, np.zeros(4), t=3)
+        writer.append(4, {'a': 1}, t=4)
+        # not flushed yet: invisible to readers
+        assert len(Chunk_Reader(str(tmp_path))) == 4
+        writer.flush()
+
+        reader = Chunk_Reader(str(tmp_path))
+        assert len(reader) == 5
+        assert sorted(os.listdir(tmp_path)) == ['chunk_000000.npy', 'chunk_000001.npy', 'chunk_000002.npy', 'chunk_000003.pkl', 'index.bin']
+        t, ctr, value = reader[2]
+        assert (t, ctr) == (2, 2)
+        np.testing.assert_array_equal(value, np.full((2, 3), 2))
+        assert reader[4] == (4, 4, {'a': 1})
+        assert [ctr for _, ctr, _ in reader] == [0, 1, 2, 3, 4]
+
+    def test_recorder(self, tmp_path):
+        control = Recording_Control(['a.data -> b.data', 'a.data -> c.data'], str(tmp_path))
+        # the executor side attaches by name
+        recorder = pickle.loads(pickle.dumps(Connection_Recorder(control, {'data': [0, 1]})))
+
+        recorder.emitted('data', 0, np.zeros(2))
+        path = control.start(['a.data -> c.data'])
+        for i in range(1, 4):
+            recorder.emitted('data', i, np.full(2, i))
+        control.stop()
+        # the next emit notices the recording stopped and writes it out
+        recorder.emitted('data', 4, np.zeros(2))
+
+        recordings = read_manifest(path)
+        assert list(recordings.keys()) == ['a.data -> c.data']
+        assert [ctr for _, ctr, _ in Chunk_Reader(recordings['a.data -> c.data'])] == [1, 2, 3]
+        assert not os.path.exists(os.path.join(path, 'con_000'))
+        control.close()
@@ -0,0 +1,33 @@
+import numpy as np
+
+from ln_studio.components.render_scheduler import Render_Task
+
+
+def achieved_fps(interval, tick=0.016, seconds=10, jitter=0.002):
+    # drives a task with the scheduler's due/ran on a jittered frame timer, returns the runs per second
+    task = Render_Task(None, None, None, interval)
+    rng = np.random.default_rng(0)
+    runs = 0
+    for now in np.arange(1, 1 + seconds, tick) + rng.uniform(0, jitter, int(np.ceil(seconds / tick))):
+        if task.due(now, tolerance=tick / 2):
+            task.ran(now)
+            runs += 1
+    return runs / seconds
+
+
+class TestRenderTask():
+
+    def test_rate(self):
+        # intervals that are not a multiple of the tick are kept on average instead of rounded up to the next tick
+        assert abs(achieved_fps(33) - 30) < 1
+        assert abs(achieved_fps(1000 / 60) - 60) < 2
+        assert abs(achieved_fps(100) - 10) < 0.5
+        assert abs(achieved_fps(1000) - 1) < 0.2
+
+    def test_no_burst(self):
+        task = Render_Task(None, None, None, 33)
+        task.ran(1)
+        # hidden for a while: runs once, not once per missed interval
+        assert task.due(10)
+        task.ran(10)
+        assert not task.due(10.016)
@@ -0,0 +1,143 @@
+import time
+import pickle
+import logging
+
+import numpy as np
+
+from ln_studio.utils.report_channel import Report_Channel, Report_Writer, Array_Summary, Truncated, reduce_state, LOG_TAIL_BYTES, LOG_LINE_CHARS
+
+
+class TestReportChannel():
+
+    def test_roundtrip(self):
+        channel = Report_Channel(['a', 'b'], slot_size=4096)
+        assert channel.read('a') is None
+
+        channel.write('b', {'fps': (1, 30.0), 'current_state': (3, {'data': np.arange(3)})})
+        assert channel.read('a') is None
+        res = channel.read('b')
+        assert res['fps'] == (1, 30.0)
+        np.testing.assert_array_equal(res['current_state'][1]['data'], np.arange(3))
+        # unchanged since the last read
+        assert channel.read('b') is None
+
+        assert not channel.write('a', {'data': (1, np.zeros(4096))})
+        assert channel.stats('a') == {'written': 0, 'dropped': 1}
+        channel.close()
+
+    def test_writer(self):
+        channel = Report_Channel(['a'], slot_size=4096)
+        # the executor side writer attaches by name
+        writer = pickle.loads(pickle.dumps(Report_Writer(channel, 'a', interval=10)))
+
+        writer(log='not enabled')
+        assert channel.read('a') is None
+
+        channel.set_enabled('a', True)
+        writer(log='first')
+        writer(current_state={'ctr': 1})
+        # merged until the interval passed
+        run, report = channel.read('a')
+        assert list(report.keys()) == ['log']
+        assert list(report['log'][1]) == [(logging.INFO, 'first')]
+        writer(log='second', exc_info=True)
+        run, report = channel.read('a')
+        assert list(report['log'][1]) == [(logging.INFO, 'first'), (logging.INFO, 'second')]
+        assert report['current_state'] == (1, {'ctr': 1})
+
+        # large arrays are summarized by the executor, the rest of the report still arrives
+        writer(current_state={'ctr': 2, 'data': np.zeros((4096, 2))})
+        writer.flush()
+        version, state = channel.read('a')[1]['current_state']
+        assert version == 2 and state['ctr'] == 2
+        assert isinstance(state['data'], Array_Summary) and state['data'].shape == (4096, 2)
+        writer.channel.close()
+        channel.close()
+
+    def test_runs(self):
+        channel = Report_Channel(['a'], slot_size=4096)
+        channel.set_enabled('a', True)
+        first = pickle.loads(pickle.dumps(Report_Writer(channel, 'a', interval=0)))
+        first(log='old')
+        run, report = channel.read('a')
+        # a restarted executor unpickles a new writer: versions start over, the run tells the reader
+        second = pickle.loads(pickle.dumps(Report_Writer(channel, 'a', interval=0)))
+        second(log='new')
+        new_run, new_report = channel.read('a')
+        assert new_run != run
+        assert report['log'][0] == new_report['log'][0] == 1
+        channel.close()
+
+    def test_reduce_state(self):
+        state = reduce_state({'ctr': 1, 'data': {'a': [np.arange(10000.)] * 200, 'b': np.arange(3)}}, max_bytes=800)
+        assert state['ctr'] == 1
+        np.testing.assert_array_equal(state['data']['b'], np.arange(3))
+        chunks = state['data']['a']
+        assert isinstance(chunks, Truncated) and chunks.total == 200 and len(chunks) == 100
+        summary = chunks[0]
+        assert summary.shape == (10000,) and (summary.min, summary.max) == (0, 9999)
+        # as many leading rows as fit
+        np.testing.assert_array_equal(summary.head, np.arange(100.))
+        assert pickle.loads(pickle.dumps(chunks)).total == 200
+
+    def test_deferred_flush(self):
+        class Node():
+            def stop(self):
+                pass
+
+        channel = Report_Channel(['a'], slot_size=4096)
+        channel.set_enabled('a', True)
+        writer = Report_Writer(channel, 'a', interval=0.05)
+        node = Node()
+        writer.attach(node)
+        writer(current_state={'ctr': 1})
+        writer(log='done')
+        # within the interval of the first write, written once it passed without another report
+        assert 'log' not in channel.read('a')[1]
+        time.sleep(0.2)
+        assert list(channel.read('a')[1]['log'][1]) == [(logging.INFO, 'done')]
+
+        writer.interval = 10
+        writer(log='last words')
+        node.stop()
+        assert list(channel.read('a')[1]['log'][1])[-1] == (logging.INFO, 'last words')
+        channel.close()
+
+    def test_log_tail(self):
+        channel = Report_Channel(['a'], slot_size=LOG_TAIL_BYTES + 4096)
+        channel.set_enabled('a', True)
+        writer = Report_Writer(channel, 'a', interval=0)
+        for i in range(200):
+            writer(log=f'{i:04d}' + 'x' * 500)
+        # bounded by bytes, so the tail alone never outgrows the slot
+        run, report = channel.read('a')
+        version, lines = report['log']
+        assert version == 200
+        assert sum(len(text) for _, text in lines) <= LOG_TAIL_BYTES
+        assert lines[-1][1].startswith('0199')
+
+        # the fallback for a report still too large shrinks the log as well
+        writer(current_state={'data': [np.zeros(512)] * 100}, log='y' * 5000)
+        run, report = channel.read('a')
+        assert len(report['log'][1]) == 10
+        assert report['log'][1][-1][1] == 'y' * LOG_LINE_CHARS + '…'
+        assert len(report['current_state'][1]['data']) == 10
+        channel.close()
+
+    def test_log_levels(self):
+        class Node():
+            def warn(self, *text):
+                self._report(log=' '.join(text))
+
+            def stop(self):
+                pass
+
+        channel = Report_Channel(['a'], slot_size=4096)
+        channel.set_enabled('a', True)
+        writer = Report_Writer(channel, 'a', interval=0)
+        node = Node()
+        node._report = writer
+        writer.attach(node)
+        node.warn('careful')
+        assert list(channel.read('a')[1]['log'][1]) == [(logging.WARNING, 'careful')]
+        channel.close()
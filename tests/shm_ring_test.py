@@ -0,0 +1,92 @@
+import pickle
+
+import numpy as np
+
+from ln_studio.utils.shm_ring import SHM_Ring_Buffer, attach_ring_buffer, RING_SLOTS
+
+
+class TestShmRing():
+
+    def test_roundtrip(self):
+        ring = SHM_Ring_Buffer(slot_size=4096, slots=3)
+        assert ring.read() == {}
+
+        ring.write(data=np.arange(12.).reshape(3, 4), channels=['a', 'b'])
+        res = ring.read()
+        np.testing.assert_array_equal(res['data'], np.arange(12.).reshape(3, 4))
+        assert res['channels'] == ['a', 'b']
+        # every frame is handed out once
+        assert ring.read() == {}
+        ring.close()
+
+    def test_counters(self):
+        ring = SHM_Ring_Buffer(slot_size=1024, slots=2)
+        for i in range(5):
+            ring.write(i=i)
+        assert ring.read() == {'i': 4}
+        assert not ring.write(data=np.zeros(1024))
+
+        stats = ring.stats()
+        assert stats['written'] == 5
+        assert stats['overwritten'] == 3
+        assert stats['skipped'] == 4
+        assert stats['dropped'] == 1
+        ring.close()
+
+    def test_read_all(self):
+        ring = SHM_Ring_Buffer(slot_size=1024, slots=3)
+        assert ring.read_all() == []
+        ring.write(i=0)
+        ring.write(i=1)
+        assert ring.read_all() == [{'i': 0}, {'i': 1}]
+        for i in range(2, 7):
+            ring.write(i=i)
+        # the ring only holds the last 3 frames
+        assert ring.read_all() == [{'i': 4}, {'i': 5}, {'i': 6}]
+        assert ring.read() == {}
+        assert ring.stats()['overwritten'] == 2
+        ring.close()
+
+    def test_paused(self):
+        ring = SHM_Ring_Buffer(slot_size=1024, slots=2)
+        ring.write(i=0)
+        # the paused flag lives in shared memory, so the writer sees it as well
+        other = pickle.loads(pickle.dumps(ring))
+        ring.set_paused(True)
+        assert other.paused
+        # one frame per PAUSED_WRITE_INTERVAL still gets through, so the view is current once shown again
+        assert other.write(i=1)
+        assert not other.write(i=2)
+        assert ring.read() == {'i': 1}
+        assert ring.stats()['suppressed'] == 1
+
+        ring.set_paused(False)
+        assert other.write(i=3)
+        assert ring.read() == {'i': 3}
+        other.close()
+        ring.close()
+
+    def test_attach_by_name(self):
+        ring = SHM_Ring_Buffer(slot_size=1024)
+        other = pickle.loads(pickle.dumps(ring))
+        other.write(x=1)
+        assert ring.read() == {'x': 1}
+        other.close()
+        ring.close()
+
+    def test_draw_slots(self):
+        class _Node():
+            _shm_size = 1024
+
+        ring = attach_ring_buffer(_Node())
+        assert ring.slots == RING_SLOTS
+        ring.close()
+
+        node = _Node()
+        node.draw_slots = 20
+        ring = attach_ring_buffer(node)
+        assert ring.slots == 20
+        for i in range(20):
+            ring.write(i=i)
+        assert len(node.get_current_states()) == 20
+        ring.close()
@@ -0,0 +1,76 @@
+import numpy as np
+
+from ln_studio.components.state_inspector import State_Model, summarize
+from ln_studio.utils.report_channel import Array_Summary, Truncated
+
+
+class _Signals():
+    """
+    Records the structure and data change signals of a model.
+    """
+
+    def __init__(self, model):
+        self.events = []
+        model.dataChanged.connect(lambda *args: self.events.append('changed'))
+        model.rowsRemoved.connect(lambda *args: self.events.append('removed'))
+        model.rowsInserted.connect(lambda *args: self.events.append('inserted'))
+
+
+class TestStateInspector():
+
+    def test_summarize(self):
+        assert summarize(np.arange(4, dtype=np.float64)) == 'float64 (4,)  min 0  max 3'
+        assert summarize(Array_Summary(np.zeros((1000, 10)), max_bytes=80)) == 'float64 (1000, 10)  min 0  max 0'
+        assert summarize(Truncated([1, 2], total=5, kind='list')) == 'list (5)'
+        assert summarize({'a': 1}) == 'dict (1 keys)'
+        assert summarize('x' * 300).endswith('…')
+
+    def test_same_keys_in_place(self):
+        model = State_Model()
+        model.set_state({'ctr': 1, 'data': [1, 2]})
+        assert model.rowCount() == 2
+        data = model.index(1, 0)
+        # expand data
+        assert model.rowCount(data) == 2
+        item = data.internalPointer()
+
+        signals = _Signals(model)
+        model.set_state({'ctr': 2, 'data': [3, 4]})
+        # values replaced, no rows removed or inserted
+        assert 'removed' not in signals.events and 'inserted' not in signals.events
+        assert 'changed' in signals.events
+        assert model.index(1, 0).internalPointer() is item
+        assert model.data(model.index(0, 1)) == '2'
+        assert model.data(model.index(1, 1, model.index(1, 0))) == '4'
+
+    def test_changed_structure(self):
+        model = State_Model()
+        model.set_state({'ctr': 1, 'data': [1, 2]})
+        assert model.rowCount(model.index(1, 0)) == 2
+
+        signals = _Signals(model)
+        model.set_state({'ctr': 1, 'data': [1, 2, 3]})
+        # only the level whose keys changed is replaced
+        assert signals.events.count('removed') == 1 and signals.events.count('inserted') == 1
+        assert model.rowCount(model.index(1, 0)) == 3
+
+        signals.events = []
+        model.set_state({'other': 0})
+        assert signals.events == ['removed', 'inserted']
+        assert model.rowCount() == 1
+        assert model.data(model.index(0, 0)) == 'other'
+
+    def test_lazy_children(self):
+        model = State_Model()
+        model.set_state({'data': np.arange(250)})
+        data = model.index(0, 0)
+        assert model.hasChildren(data)
+
+        signals = _Signals(model)
+        # never expanded: nothing below the top level to update
+        model.set_state({'data': np.arange(300)})
+        assert 'removed' not in signals.events and 'inserted' not in signals.events
+
+        # first MAX_CHILDREN rows and one summarizing the rest
+        assert model.rowCount(data) == 101
+        assert model.data(model.index(100, 1, data)) == '200 more'
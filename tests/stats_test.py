@@ -0,0 +1,63 @@
+import csv
+
+import numpy as np
+
+from ln_studio.utils.stats import Latency_Histogram, Frame_Stats, write_frame_stats_csv
+
+
+class TestLatencyHistogram():
+
+    def test_percentiles(self):
+        hist = Latency_Histogram()
+        assert hist.percentile(50) == 0
+        for d in np.linspace(0.001, 0.1, 100):
+            hist.add(d)
+        assert hist.count == 100
+        assert abs(hist.mean() - 0.0505) < 1e-9
+        # bins are ~12% wide
+        assert 0.05 <= hist.percentile(50) < 0.05 * 1.13
+        assert hist.percentile(100) == hist.max == 0.1
+
+    def test_merge(self):
+        a, b = Latency_Histogram(), Latency_Histogram()
+        a.add(0.001)
+        b.add(0.002)
+        b.add(200)
+        a.merge(b)
+        assert a.count == 3
+        assert a.max == 200
+        assert a.percentile(100) == 200
+
+
+class TestFrameStats():
+
+    def test_update_only(self):
+        # updates that did not draw are not frames
+        stats = Frame_Stats()
+        stats.add_update(0.002)
+        stats.add_update(0.004)
+        assert stats.frames == 0
+        assert stats.fps() == 0
+        assert stats.summary()['draw_max_ms'] == 0
+        assert stats.summary()['update_p99_ms'] > 0
+
+    def test_draws(self):
+        stats = Frame_Stats()
+        for _ in range(3):
+            stats.add_update(0.001)
+        stats.add_draw(0.010)
+        stats.skipped += 1
+        summary = stats.summary()
+        assert summary['frames'] == 1
+        assert summary['skipped'] == 1
+        assert summary['draw_max_ms'] == 10
+
+    def test_csv(self, tmp_path):
+        stats = Frame_Stats()
+        stats.add_draw(0.005)
+        path = tmp_path / 'frame_stats.csv'
+        write_frame_stats_csv(path, {'Plot': stats})
+        with open(path) as f:
+            rows = list(csv.DictReader(f))
+        assert rows[0]['view'] == 'Plot'
+        assert int(rows[0]['frames']) == 1
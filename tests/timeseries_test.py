@@ -0,0 +1,56 @@
+import numpy as np
+
+from ln_studio.components.views.timeseries import Minmax_History, decimate
+
+
+class TestTimeseries():
+
+    def test_decimate(self):
+        values = np.arange(10, dtype=np.float32)[None]
+        lo, hi = decimate(values, values, 3)
+        np.testing.assert_array_equal(lo, [[0, 3, 6]])
+        np.testing.assert_array_equal(hi, [[2, 5, 9]])
+
+    def test_partial_blocks(self):
+        history = Minmax_History(8, blocks=2)
+        assert (history.block, history.capacity) == (4, 8)
+
+        history.append([1, 5])
+        history.append([3])
+        # the partially written block covers all of its samples so far
+        assert (history.lo[0, 0], history.hi[0, 0]) == (1, 5)
+
+        # completes the first block and starts the second
+        history.append([0, 9])
+        np.testing.assert_array_equal(history.lo[0, :2], [0, 9])
+        np.testing.assert_array_equal(history.hi[0, :2], [5, 9])
+
+    def test_wrap(self):
+        history = Minmax_History(8, blocks=2)
+        # only the newest capacity samples are kept
+        history.append(np.arange(10))
+        np.testing.assert_array_equal(history.samples(), [np.arange(2, 10)])
+
+        history.append([100, 101])
+        assert (history.pos, history.filled) == (2, 8)
+        np.testing.assert_array_equal(history.samples(), [[4, 5, 6, 7, 8, 9, 100, 101]])
+        # the partially overwritten block is the newest, it only covers its new samples
+        x0, lo, hi = history.envelope(2)
+        assert x0 == 0
+        np.testing.assert_array_equal(lo, [[6, 100]])
+        np.testing.assert_array_equal(hi, [[9, 101]])
+
+    def test_envelope(self):
+        history = Minmax_History(8, blocks=2)
+        history.append(np.array([[0, 10], [4, 11], [2, 12], [3, 13]]))
+        # half filled: starts in the middle of the window
+        x0, lo, hi = history.envelope(4)
+        assert x0 == 2
+        np.testing.assert_array_equal(lo, [[0], [10]])
+        np.testing.assert_array_equal(hi, [[4], [13]])
+        # more columns than samples are drawn as lines instead
+        assert history.envelope(16) is None
+
+        # another number of channels starts over
+        history.append(np.zeros((1, 3)))
+        assert history.buffer.shape == (3, 8) and history.filled == 1